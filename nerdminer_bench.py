@@ -0,0 +1,1157 @@
+import argparse
+import collections
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from nerdminer_hashing import (make_hasher, available_engines, demo_header, HeaderHasher,
+                               target_to_difficulty, difficulty_to_target, double_sha256,
+                               MerkleBuilder, verify_merkle)
+from nerdminer_workers import ProcessMiner
+from nerdminer_scheduler import WorkScheduler, JobPrefetcher, demo_template, PROCESS_CHUNK
+from nerdminer_stratum import MockPool, header_from_notify, stratum_message
+from nerdminer_proxy import StratumProxy
+from nerdminer_fleet import FleetAggregator, make_fleet_server, parse_nodes, NODE_PORT
+from nerdminer_thermal import ThermalSensors, ThermalGovernor
+
+# Пачка для потоковых движков, как у воркеров майнера
+BATCH = 256
+# Допустимое падение H/s относительно базовой линии
+TOLERANCE = 0.10
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * (len(values) - 1) + 0.5))]
+
+
+def latency_summary(latencies, elapsed):
+    """p50/p99 в миллисекундах и число запросов в секунду"""
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+# ---------- HTTP: задержка /api/stats под нагрузкой ----------
+
+def serve_dashboard(port, mining, ready):
+    """Дочерний процесс: веб-интерфейс майнера"""
+    import nerdminer_v2_android as web
+
+    web.NerdMinerHandler.log_message = lambda *args: None
+    miner = web.NerdMinerV2(journal_path=None)
+    if mining:
+        miner.start_mining()
+    with web.make_server(miner, port, '127.0.0.1') as httpd:
+        ready.set()
+        httpd.serve_forever()
+
+
+async def http_client(host, port, path, deadline, latencies):
+    """Один клиент keep-alive: запросы подряд до deadline"""
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def http_load(host, port, path, clients, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(http_client(host, port, path, deadline, latencies)
+                           for _ in range(clients)))
+    return latency_summary(latencies, time.perf_counter() - start)
+
+
+def bench_http(args):
+    host, port = '127.0.0.1', args.port
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve_dashboard,
+                                     args=(port, args.mining, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+
+    results = {}
+    try:
+        for clients in args.clients:
+            results[str(clients)] = asyncio.run(
+                http_load(host, port, '/api/stats', clients, args.duration))
+    finally:
+        server.terminate()
+    return {'benchmark': 'http', 'path': '/api/stats', 'mining': args.mining,
+            'concurrency': results}
+
+
+# ---------- Хеширование: H/s движков и масштабирование ----------
+
+def string_scanner(worker_id):
+    """Старый путь: f-строка + hexdigest на каждый хеш"""
+    def scan():
+        for _ in range(BATCH):
+            data = f"nerdminer{worker_id}{time.time()}{random.randint(0, 1000000000)}"
+            hashlib.sha256(data.encode()).hexdigest()
+        return BATCH
+    return scan
+
+
+def header_scanner(engine):
+    """Перебор nonce движком hashlib/numpy; цель 0 - без шар"""
+    hasher = make_hasher(demo_header(), engine)
+    batch = max(BATCH, hasher.min_batch)
+    state = {'nonce': 0}
+
+    def scan():
+        hasher.scan(state['nonce'], batch, 0)
+        state['nonce'] += batch
+        return batch
+    return scan
+
+
+def thread_rate(make_scan, workers, duration):
+    """H/s нескольких потоков, каждый со своим сканером"""
+    counts = [0] * workers
+    scanners = [make_scan(i) for i in range(workers)]
+    deadline = time.perf_counter() + duration
+
+    def run(i):
+        while time.perf_counter() < deadline:
+            counts[i] += scanners[i]()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def process_rate(workers, duration, warmup=1.0):
+    """H/s пула процессов; запуск процессов не входит в замер"""
+    counts = [0]
+
+    def on_hashes(index, count, durations):
+        counts[0] += count
+
+    scheduler = WorkScheduler(chunk=PROCESS_CHUNK)
+    scheduler.set_template(demo_template(target=0))
+    miner = ProcessMiner(scheduler, workers=workers, on_hashes=on_hashes)
+    miner.start()
+    try:
+        time.sleep(warmup)
+        start_count, start = counts[0], time.perf_counter()
+        time.sleep(duration)
+        return (counts[0] - start_count) / (time.perf_counter() - start)
+    finally:
+        miner.stop()
+
+
+def bench_hashing(args):
+    engines = {
+        'string': lambda workers: thread_rate(string_scanner, workers, args.duration),
+    }
+    for name in available_engines():
+        engines[name] = (lambda name: lambda workers: thread_rate(
+            lambda i: header_scanner(name), workers, args.duration))(name)
+    engines['process'] = lambda workers: process_rate(workers, args.duration)
+    selected = args.engines or list(engines)
+
+    results = {}
+    for name in selected:
+        results[name] = {}
+        for workers in args.workers:
+            runs = [engines[name](workers) for _ in range(args.repeat)]
+            mean = statistics.mean(runs)
+            stdev = statistics.stdev(runs) if len(runs) > 1 else 0.0
+            results[name][str(workers)] = {
+                'hps': round(mean),
+                'stdev': round(stdev),
+                'cv': round(stdev / mean, 4) if mean else 0.0,
+                'runs': [round(r) for r in runs],
+            }
+        # Эффективность масштабирования: H/s(n) / (n * H/s(1))
+        single = results[name].get('1', {}).get('hps')
+        for workers, entry in results[name].items():
+            if single:
+                entry['scaling'] = round(entry['hps'] / (int(workers) * single), 3)
+
+    report = {'benchmark': 'hashing', 'cpu_count': os.cpu_count(),
+              'duration': args.duration, 'repeat': args.repeat, 'results': results}
+    if args.baseline:
+        report['regressions'] = compare_baseline(results, args.baseline, args.tolerance)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare_baseline(results, path, tolerance):
+    """Сравнение с сохраненным прогоном: падение H/s больше tolerance - регрессия"""
+    with open(path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, by_workers in results.items():
+        for workers, entry in by_workers.items():
+            before = baseline.get(name, {}).get(workers)
+            if not before or not before['hps']:
+                continue
+            change = entry['hps'] / before['hps'] - 1
+            if change < -tolerance:
+                regressions.append({'engine': name, 'workers': int(workers),
+                                    'baseline_hps': before['hps'], 'hps': entry['hps'],
+                                    'change': round(change, 3)})
+    return regressions
+
+
+# ---------- Планировщик: покрытие без пересечений и накладные расходы ----------
+
+def bench_scheduler(args):
+    """Потоки разбирают диапазоны; проверяем, что каждый nonce выдан ровно один раз"""
+    scheduler = WorkScheduler(chunk=args.chunk, nonce_space=args.nonce_space)
+    scheduler.set_template(demo_template())
+    units = [[] for _ in range(args.workers)]
+
+    def run(i):
+        for _ in range(args.units):
+            work = scheduler.next_work()
+            units[i].append((work['extranonce2'], work['ntime'], work['nonce_start'], work['nonce_end']))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # По каждому заголовку диапазоны должны идти встык от 0 без наложений
+    overlaps = gaps = 0
+    by_header = {}
+    for unit in sorted(u for worker_units in units for u in worker_units):
+        end = by_header.get(unit[:2], 0)
+        if unit[2] < end:
+            overlaps += 1
+        elif unit[2] > end:
+            gaps += 1
+        by_header[unit[:2]] = unit[3]
+
+    total = args.workers * args.units
+    durations = scheduler.durations
+    return {
+        'benchmark': 'scheduler',
+        'workers': args.workers,
+        'units': total,
+        'headers': scheduler.headers,
+        'ntime_rolls': scheduler.ntime_rolls,
+        'overlaps': overlaps,
+        'gaps': gaps,
+        'units_per_s': round(total / elapsed),
+        'mean_us': round(durations.sum / durations.count() * 1e6, 2),
+    }
+
+
+# ---------- Пулы: потери при отказе активного пула ----------
+
+def bench_failover(args):
+    """Мок-пулы с задержками; активный по очереди падает или замолкает"""
+    import nerdminer_v2_android as web
+
+    pools = []
+    for latency in args.latency:
+        pool = MockPool(port=0, difficulty=args.difficulty, job_interval=args.job_interval,
+                        latency=latency)
+        pool.start_in_thread()
+        pools.append(pool)
+    by_name = {f"127.0.0.1:{pool.port}": pool for pool in pools}
+
+    miner = web.NerdMinerV2(workers=args.workers, pool=','.join(by_name), journal_path=None)
+    miner.update_network_data = lambda: None
+    miner.start_mining()
+    manager = miner.pools
+    manager.job_timeout = args.job_timeout
+    manager.reply_timeout = args.reply_timeout
+    manager.failure_backoff = args.settle * len(args.modes) * 2
+
+    events = []
+    try:
+        time.sleep(args.settle)
+        first = manager.active.name
+        for mode in args.modes:
+            name = manager.active.name
+            failovers = len(manager.failovers)
+            hash_rate = miner.stats['hash_rate']
+            outage_time = time.time()
+            by_name[name].set_outage(mode)
+
+            # Ждем первое задание от нового пула
+            deadline = outage_time + args.job_timeout + args.reply_timeout + 30
+            while time.time() < deadline and (len(manager.failovers) == failovers or
+                                              'job_time' not in manager.failovers[-1]):
+                time.sleep(0.05)
+            by_name[name].set_outage(None)
+            if len(manager.failovers) == failovers:
+                events.append({'mode': mode, 'from': name, 'error': 'no failover'})
+                continue
+
+            event = manager.failovers[-1]
+            lost = event.get('job_time', time.time()) - outage_time
+            events.append({
+                'mode': mode,
+                'from': event['from'],
+                'to': event['to'],
+                'reason': event['reason'],
+                'detect_s': round(event['time'] - outage_time, 3),
+                'switch_s': round(event.get('job_time', time.time()) - event['time'], 3),
+                'lost_s': round(lost, 3),
+                # Воркеро-секунды и хеши, потраченные на задание мертвого пула
+                'lost_hash_seconds': round(lost * args.workers, 3),
+                'lost_hashes': round(lost * hash_rate),
+            })
+            time.sleep(args.settle)
+    finally:
+        miner.stop_mining()
+
+    return {
+        'benchmark': 'failover',
+        'workers': args.workers,
+        'job_timeout': args.job_timeout,
+        'reply_timeout': args.reply_timeout,
+        'first_pool': first,
+        'pools': manager.status()['pools'],
+        'failovers': events,
+        'accepted': sum(pool.accepted for pool in pools),
+        'rejected': sum(pool.rejected for pool in pools),
+        'stale_shares': manager.stale,
+    }
+
+
+# ---------- Флот: опрос сотен узлов одним ядром ----------
+
+def serve_fake_nodes(count, ports, stop):
+    """Дочерний процесс: count узлов, отвечающих на /api/stats как NerdMinerV2"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b'\r\n\r\n')
+                body = json.dumps({
+                    'mining': True,
+                    'hash_rate': random.randint(200000, 600000),
+                    'total_hashes': random.randint(10 ** 9, 10 ** 10),
+                    'accepted_shares': random.randint(0, 100),
+                    'rejected_shares': random.randint(0, 3),
+                    'uptime': '01:00:00',
+                    'workers': [250000, 250000],
+                    'sparkline': [50] * 30,
+                    'last_shares': [],
+                }).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-type: application/json\r\n'
+                             b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def run():
+        servers = [await asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024)
+                   for _ in range(count)]
+        ports.put([server.sockets[0].getsockname()[1] for server in servers])
+        while not stop.is_set():
+            await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+
+
+def bench_fleet(args):
+    # Разбор --nodes: узел без порта и лишние запятые
+    parsed = parse_nodes('10.0.0.1:8081,10.0.0.2, ,')
+    parse_ok = parsed == [('10.0.0.1', 8081), ('10.0.0.2', NODE_PORT)]
+
+    results = {}
+    for count in args.nodes:
+        ports = multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        nodes = multiprocessing.Process(target=serve_fake_nodes, args=(count, ports, stop), daemon=True)
+        nodes.start()
+        node_list = parse_nodes(','.join(f"127.0.0.1:{port}" for port in ports.get(timeout=30)))
+
+        fleet = FleetAggregator(node_list, interval=args.interval)
+        server = make_fleet_server(fleet, args.port, '127.0.0.1')
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        cpu_start, start = time.process_time(), time.perf_counter()
+        fleet.start()
+        try:
+            # Пока идет опрос, дашборд тоже нагружен запросами /api/fleet
+            api = asyncio.run(http_load('127.0.0.1', args.port, '/api/fleet', args.clients, args.duration))
+        finally:
+            fleet.stop()
+            elapsed = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            server.shutdown()
+            server.server_close()
+            stop.set()
+            nodes.join(5)
+
+        cycles = list(fleet.cycles)
+        results[str(count)] = {
+            'cycles': len(cycles),
+            'cycle_p50_ms': round(percentile(cycles, 0.50) * 1000, 1),
+            'cycle_p99_ms': round(percentile(cycles, 0.99) * 1000, 1),
+            'polls_per_s': round(fleet.polls / elapsed, 1),
+            'nodes_up': fleet.summary['totals']['nodes_up'],
+            'errors': sum(node.errors for node in fleet.nodes),
+            # Доля одного ядра: поток опроса отдельно и весь процесс с нагрузкой на API
+            'poll_cpu_percent': round(100 * fleet.cpu_seconds / elapsed, 1),
+            'process_cpu_percent': round(100 * cpu / elapsed, 1),
+            'api': api,
+        }
+    return {'benchmark': 'fleet', 'interval': args.interval, 'nodes': results,
+            'parse_nodes': parsed, 'invalid': not parse_ok}
+
+
+# ---------- Прокси: рассылка mining.notify сотням майнеров ----------
+
+def serve_proxy(pool_port, port, ready):
+    """Дочерний процесс: прокси с одной сессией к мок-пулу"""
+    async def run():
+        proxy = StratumProxy('127.0.0.1', pool_port, 'bench', host='127.0.0.1', port=port)
+        await proxy.start()
+        while proxy.extranonce1 is None:
+            await asyncio.sleep(0.05)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def proxy_miner(port, sent, deadline, stats, submitting):
+    """Майнер за прокси: время получения каждого задания и одна настоящая шара на задание"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(stratum_message(1, 'mining.subscribe', ['bench']) +
+                 stratum_message(2, 'mining.authorize', ['bench', 'x']))
+    extranonce1, extranonce2_size = b'', 0
+    target = 0
+    submits = {}
+    message_id = 2
+    try:
+        while time.time() < deadline:
+            line = await asyncio.wait_for(reader.readline(), timeout=deadline - time.time() + 1)
+            if not line:
+                break
+            arrival = time.time()
+            message = json.loads(line)
+            method = message.get('method')
+            if method == 'mining.notify':
+                notify = message['params']
+                if notify[0] in sent:
+                    stats['latency'].setdefault(notify[0], []).append(arrival - sent[notify[0]])
+                if not submitting:
+                    continue
+                extranonce2 = bytes(extranonce2_size)
+                hasher = HeaderHasher(header_from_notify(notify, extranonce1, extranonce2))
+                found = hasher.scan(0, 256, target)
+                if found:
+                    message_id += 1
+                    submits[message_id] = time.time()
+                    writer.write(stratum_message(message_id, 'mining.submit', [
+                        'bench', notify[0], extranonce2.hex(), notify[7], f"{found[0][0]:08x}"]))
+            elif method == 'mining.set_difficulty':
+                target = difficulty_to_target(message['params'][0])
+            elif message.get('id') == 1:
+                extranonce1 = bytes.fromhex(message['result'][1])
+                extranonce2_size = message['result'][2]
+            elif message.get('id') in submits:
+                stats['submit'].append(arrival - submits.pop(message['id']))
+                stats['accepted' if message.get('result') else 'rejected'] += 1
+                if message.get('error'):
+                    stats['errors'][message['error'][1]] += 1
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        writer.close()
+
+
+def bench_proxy(args):
+    results = {}
+    for clients in args.clients:
+        # Цель шары 1/8: майнер находит ее за пару хешей, пул проверяет каждую
+        pool = MockPool(port=0, difficulty=target_to_difficulty((1 << 256) // 8),
+                        job_interval=args.interval)
+        sent = {}
+        new_job = pool.new_job
+
+        def timed_new_job():
+            new_job()
+            sent[pool.job_order[-1]] = time.time()
+
+        pool.new_job = timed_new_job
+        pool_port = pool.start_in_thread()
+
+        ready = multiprocessing.Event()
+        proxy = multiprocessing.Process(target=serve_proxy, args=(pool_port, args.port, ready), daemon=True)
+        proxy.start()
+        ready.wait(10)
+
+        stats = {'latency': {}, 'submit': [], 'accepted': 0, 'rejected': 0,
+                 'errors': collections.Counter()}
+        # Шары шлет только часть майнеров: хеширование в этом же процессе искажало бы замер
+        submitting = max(1, int(clients * args.submit_fraction))
+
+        async def run():
+            deadline = time.time() + args.duration
+            await asyncio.gather(*(proxy_miner(args.port, sent, deadline, stats, i < submitting)
+                                   for i in range(clients)))
+
+        try:
+            asyncio.run(run())
+        finally:
+            proxy.terminate()
+
+        per_job = [latencies for latencies in stats['latency'].values() if len(latencies) == clients]
+        latencies = [t for job in per_job for t in job]
+        results[str(clients)] = {
+            'notifies': len(per_job),
+            'deliveries': len(latencies),
+            'notify_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'notify_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'notify_max_ms': round(max(latencies, default=0) * 1000, 2),
+            # От первого до последнего майнера в одной рассылке
+            'spread_p50_ms': round(percentile([max(j) - min(j) for j in per_job], 0.50) * 1000, 2),
+            'submit_p50_ms': round(percentile(stats['submit'], 0.50) * 1000, 2),
+            'submit_p99_ms': round(percentile(stats['submit'], 0.99) * 1000, 2),
+            'accepted': stats['accepted'],
+            'rejected': stats['rejected'],
+            'errors': dict(stats['errors']),
+        }
+    return {'benchmark': 'proxy', 'interval': args.interval, 'clients': results}
+
+
+# ---------- Термо-регулятор: поддельный sysfs и модель нагрева ----------
+
+def make_fake_sysfs(root, cpu='30000', battery_raw='300'):
+    """thermal_zone0 (CPU), битая thermal_zone1 и батарея - как на телефоне"""
+    files = {}
+    for name, kind, content in (('thermal_zone0', 'cpu-0-0', cpu),
+                                ('thermal_zone1', 'modem', 'not a number')):
+        zone = os.path.join(root, 'class', 'thermal', name)
+        os.makedirs(zone)
+        with open(os.path.join(zone, 'type'), 'w') as f:
+            f.write(kind + '\n')
+        files[kind] = os.path.join(zone, 'temp')
+        with open(files[kind], 'w') as f:
+            f.write(content + '\n')
+    battery = os.path.join(root, 'class', 'power_supply', 'battery')
+    os.makedirs(battery)
+    with open(os.path.join(battery, 'type'), 'w') as f:
+        f.write('Battery\n')
+    files['battery'] = os.path.join(battery, 'temp')
+    with open(files['battery'], 'w') as f:
+        f.write(battery_raw + '\n')
+    return files
+
+
+def write_temp(path, value):
+    # Запись на месте: дескриптор датчика остается тем же файлом, как в sysfs
+    with open(path, 'r+') as f:
+        f.write(f"{value:<12}\n")
+
+
+def bench_thermal(args):
+    """Регулятор против модели первого порядка: T -> ambient + heat * воркеры * duty"""
+    with tempfile.TemporaryDirectory() as root:
+        files = make_fake_sysfs(root)
+        sensors = ThermalSensors(root, ttl=0)
+        governor = ThermalGovernor(args.workers, target=args.target)
+
+        cpu = battery = args.ambient
+        temps, capacities = [], []
+        changes = reversals = 0
+        direction = 0
+        for step in range(int(args.duration)):
+            # Батарея греется от CPU медленнее
+            heat = args.ambient + args.heat * governor.capacity
+            cpu += (heat - cpu) / args.tau
+            battery += (cpu - 5 - battery) / (args.tau * 3)
+            write_temp(files['cpu-0-0'], int(cpu * 1000))
+            write_temp(files['battery'], int(battery * 10))
+
+            temperature = sensors.temperature()
+            before = governor.capacity
+            if governor.update(temperature, now=step):
+                changes += 1
+                new_direction = 1 if governor.capacity > before else -1
+                if direction and new_direction != direction:
+                    reversals += 1
+                direction = new_direction
+            temps.append(temperature)
+            capacities.append(governor.capacity)
+
+        # Цена чтения датчиков: без кеша и из кеша
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            sensors.read()
+        uncached_us = (time.perf_counter() - start) / args.reads * 1e6
+        sensors.ttl = 60
+        start = time.perf_counter()
+        for _ in range(args.reads):
+            sensors.read()
+        cached_us = (time.perf_counter() - start) / args.reads * 1e6
+        found = sorted(sensors.read())
+        sensors.close()
+
+    # Холодный телефон: батарея 120 - это 12.0 °C, а зона в градусах остается градусами
+    with tempfile.TemporaryDirectory() as root:
+        make_fake_sysfs(root, cpu='40', battery_raw='120')
+        sensors = ThermalSensors(root, ttl=0)
+        cold = sensors.read()
+        sensors.close()
+    cold_ok = cold == {'cpu-0-0': 40.0, 'battery': 12.0}
+
+    tail = temps[len(temps) // 2:]
+    return {
+        'benchmark': 'thermal',
+        'sensors': found,
+        'target': args.target,
+        'unthrottled_temp': args.ambient + args.heat * args.workers,
+        'max_temp': round(max(temps), 2),
+        'overshoot': round(max(temps) - args.target, 2),
+        'steady_min': round(min(tail), 2),
+        'steady_max': round(max(tail), 2),
+        'changes': changes,
+        'reversals': reversals,
+        'active_workers': governor.active_workers,
+        'duty': round(governor.duty, 3),
+        'read_us': round(uncached_us, 2),
+        'cached_read_us': round(cached_us, 3),
+        'cold_read': cold,
+        'invalid': not cold_ok,
+    }
+
+
+# ---------- Подготовка заданий: простой воркеров между заданиями ----------
+
+def bench_prefetch(args):
+    """Частые задания пула: заголовок и хешер на воркере (inline) против фоновой подготовки"""
+    results = {}
+    for mode in ('inline', 'prefetch'):
+        scheduler = WorkScheduler(chunk=args.chunk)
+        scheduler.set_template(demo_template())
+        prefetcher = JobPrefetcher(scheduler, args.workers, args.engine) if mode == 'prefetch' else None
+        idle = [0.0] * args.workers
+        switches = [0] * args.workers
+        hashes = [0] * args.workers
+        stop = threading.Event()
+
+        def run(i):
+            job = header = wait_since = None
+            nonce = end = 0
+            while not stop.is_set():
+                current = prefetcher.generation if prefetcher else scheduler.generation
+                if job is None or job['generation'] != current or nonce >= end:
+                    # Ожидание длиннее timeout take() - одно ожидание, а не несколько
+                    if wait_since is None:
+                        wait_since = time.perf_counter()
+                    if prefetcher:
+                        prepared = prefetcher.take(i, timeout=0.1)
+                        if prepared is None:
+                            continue
+                        job, hasher = prepared
+                    else:
+                        job = scheduler.next_work()
+                        if job['header'] != header:
+                            hasher = make_hasher(job['header'], args.engine)
+                            header = job['header']
+                    idle[i] += time.perf_counter() - wait_since
+                    wait_since = None
+                    switches[i] += 1
+                    nonce, end = job['nonce_start'], job['nonce_end']
+                count = min(max(args.batch, hasher.min_batch), end - nonce)
+                hasher.scan(nonce, count, job['target'])
+                nonce += count
+                hashes[i] += count
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(args.workers)]
+        for thread in threads:
+            thread.start()
+        if prefetcher:
+            prefetcher.start()
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.duration:
+            time.sleep(args.job_interval)
+            scheduler.set_template(demo_template())
+            if prefetcher:
+                prefetcher.refresh()
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if prefetcher:
+            prefetcher.stop()
+
+        total_switches = sum(switches)
+        results[mode] = {
+            'hps': round(sum(hashes) / elapsed),
+            'switches': total_switches,
+            'idle_us_per_switch': round(sum(idle) / total_switches * 1e6, 1) if total_switches else 0.0,
+            'idle_ms_per_worker': [round(s * 1000, 2) for s in idle],
+        }
+    return {'benchmark': 'prefetch', 'engine': args.engine, 'workers': args.workers,
+            'job_interval': args.job_interval, 'modes': results}
+
+
+# ---------- Merkle: root на extranonce2 ----------
+
+def naive_root(notify, extranonce1, extranonce2):
+    """Как раньше: конкатенация coinbase и hex ветки на каждый root"""
+    coinbase = bytes.fromhex(notify[2]) + extranonce1 + extranonce2 + bytes.fromhex(notify[3])
+    root = double_sha256(coinbase)
+    for h in notify[4]:
+        root = double_sha256(root + bytes.fromhex(h))
+    return root
+
+
+def count_sha256(call):
+    """Число вызовов hashlib.sha256 за call()"""
+    calls = [0]
+    original = hashlib.sha256
+
+    def counted(*args):
+        calls[0] += 1
+        return original(*args)
+
+    hashlib.sha256 = counted
+    try:
+        call()
+    finally:
+        hashlib.sha256 = original
+    return calls[0]
+
+
+def bench_merkle(args):
+    """roots/s MerkleBuilder против сборки строками; сверка с mainnet и между собой"""
+    extranonce1 = os.urandom(4)
+    results = []
+    mismatches = 0
+    for depth in args.branch:
+        notify = ['bench', os.urandom(32).hex(), os.urandom(args.coinb1).hex(),
+                  os.urandom(args.coinb2).hex(), [os.urandom(32).hex() for _ in range(depth)],
+                  '20000000', '1d00ffff', f"{int(time.time()):08x}"]
+        builder = MerkleBuilder.from_notify(notify, extranonce1, 4)
+        for extranonce2 in range(args.check):
+            if builder.root(extranonce2) != naive_root(notify, extranonce1, extranonce2.to_bytes(4, 'big')):
+                mismatches += 1
+
+        rates = {}
+        for name, root in (('naive', lambda n: naive_root(notify, extranonce1, n.to_bytes(4, 'big'))),
+                           ('builder', builder.root)):
+            count = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.duration:
+                for n in range(count, count + 1000):
+                    root(n)
+                count += 1000
+            rates[name] = round(count / (time.perf_counter() - start))
+        # Двойных SHA-256 на root: одиночный sha256 coinbase идет от копии midstate
+        calls = count_sha256(lambda: builder.root(12345))
+        results.append({
+            'branch': depth,
+            'naive_roots_per_s': rates['naive'],
+            'builder_roots_per_s': rates['builder'],
+            'speedup': round(rates['builder'] / rates['naive'], 2),
+            'double_sha256_per_root': (calls + 1) / 2,
+        })
+    mainnet = verify_merkle()
+    return {'benchmark': 'merkle', 'coinbase_bytes': args.coinb1 + 8 + args.coinb2,
+            'mainnet_vectors': 'OK' if mainnet else 'MISMATCH', 'mismatches': mismatches,
+            'results': results, 'invalid': not mainnet or mismatches > 0}
+
+
+# ---------- Старт headless-майнера: время до первого хеша ----------
+
+def run_timed(command):
+    """Секунды от запуска процесса до его первой строки в stdout"""
+    import subprocess
+    start = time.perf_counter()
+    child = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = child.stdout.readline()
+    elapsed = time.perf_counter() - start
+    stderr = child.communicate()[1]
+    return elapsed, line.strip(), stderr, child.returncode
+
+
+def parse_importtime(stderr):
+    """-X importtime: модуль верхнего уровня -> накопленные микросекунды"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def bench_startup(args):
+    """Запуск nerdminer_mine.py --startup-check против пустого интерпретатора"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nerdminer_mine.py')
+    interpreter, total = [], []
+    for _ in range(args.repeat):
+        interpreter.append(run_timed([sys.executable, '-c', 'print()'])[0])
+        total.append(run_timed([sys.executable, script, '--startup-check'])[0])
+
+    # Импорты майнера без импортов самого интерпретатора (site и т.п.)
+    elapsed, line, stderr, code = run_timed([sys.executable, '-X', 'importtime', script, '--startup-check'])
+    modules = parse_importtime(stderr)
+    site = set(parse_importtime(run_timed([sys.executable, '-X', 'importtime', '-c', 'print()'])[2]))
+    imports = {name: round(us / 1000, 2) for name, us in modules.items() if name not in site}
+    heavy = [name for name in ('asyncio', 'requests', 'kivy', 'numpy', 'http.server', 'multiprocessing')
+             if name in imports]
+
+    startup_ms = (statistics.median(total) - statistics.median(interpreter)) * 1000
+    return {
+        'benchmark': 'startup',
+        'interpreter_ms': round(statistics.median(interpreter) * 1000, 1),
+        'total_ms': round(statistics.median(total) * 1000, 1),
+        'startup_ms': round(startup_ms, 1),
+        'budget_ms': args.budget,
+        'reported': line,
+        'import_ms': round(sum(imports.values()), 2),
+        'imports': dict(sorted(imports.items(), key=lambda item: -item[1])[:10]),
+        'heavy_imports': heavy,
+        'over_budget': startup_ms > args.budget or bool(heavy),
+    }
+
+
+
+# ---------- Сетевые данные: кеш, параллельные запросы и теплый старт ----------
+
+def serve_fake_api(delay):
+    """Подмена coingecko и blockchain.info на http.server; каждый ответ с задержкой delay"""
+    import http.server
+
+    class ApiHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            server = self.server
+            server.requests[self.path] += 1
+            time.sleep(server.delay)
+            if self.path in server.fail or self.path not in server.bodies():
+                self.send_error(500)
+                return
+            body = server.bodies()[self.path].encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ApiHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.requests = collections.Counter()
+    server.fail = set()
+    server.values = {'btc_price': 60000, 'block_height': 850000, 'difficulty': 8.3e13}
+    server.bodies = lambda: {
+        '/price': json.dumps({'bitcoin': {'usd': server.values['btc_price']}}),
+        '/q/getblockcount': str(server.values['block_height']),
+        '/q/getdifficulty': repr(server.values['difficulty']),
+    }
+    threading.Thread(target=server.serve_forever, name='fake-api', daemon=True).start()
+    return server
+
+
+def bench_network(args):
+    """NetworkDataProvider против подмены API: каждая проверка - ok и замеры"""
+    from nerdminer_network import NetworkDataProvider
+
+    server = serve_fake_api(args.delay)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    checks = {}
+    with tempfile.TemporaryDirectory() as root:
+        cache_file = os.path.join(root, 'network_cache.json')
+
+        def make_provider(url, ttl):
+            return NetworkDataProvider(ttl=ttl, cache_file=cache_file, price_url=f"{url}/price",
+                                       blockchain_url=url, timeout=args.delay * 10)
+
+        # Три источника параллельно: время - одна задержка, а не три
+        provider = make_provider(base, args.ttl)
+        start = time.perf_counter()
+        ok = provider.refresh()
+        elapsed = time.perf_counter() - start
+        checks['concurrent_fetch'] = {
+            'ok': ok and provider.values == server.values and elapsed < 2 * args.delay,
+            'elapsed_ms': round(elapsed * 1000, 1), 'serial_ms': round(3 * args.delay * 1000, 1)}
+
+        # Свежий кеш: get() не ходит в сеть
+        before = sum(server.requests.values())
+        start = time.perf_counter()
+        for _ in range(args.gets):
+            values = provider.get()
+        elapsed = time.perf_counter() - start
+        requests = sum(server.requests.values()) - before
+        checks['ttl_hit'] = {'ok': requests == 0 and values == server.values,
+                             'requests': requests, 'get_us': round(elapsed / args.gets * 1e6, 2)}
+
+        # Устаревший кеш: get() сразу отдает старое, новое приходит в фоне
+        old = dict(provider.values)
+        server.values = dict(server.values, btc_price=61000, block_height=850001)
+        provider.updated = provider.last_attempt = 0.0
+        start = time.perf_counter()
+        values = provider.get()
+        elapsed = time.perf_counter() - start
+        deadline = time.time() + args.delay * 10
+        while provider.values != server.values and time.time() < deadline:
+            time.sleep(0.01)
+        checks['stale_while_revalidate'] = {
+            'ok': values == old and elapsed < args.delay / 2 and provider.values == server.values,
+            'get_ms': round(elapsed * 1000, 3),
+            'revalidated_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+        # Один источник упал: остальные обновляются, его значение остается прежним
+        server.fail = {'/q/getdifficulty'}
+        server.values = dict(server.values, btc_price=62000, difficulty=9.1e13)
+        ok = provider.refresh()
+        expected = dict(server.values, difficulty=old['difficulty'])
+        checks['partial_failure'] = {'ok': ok and provider.values == expected,
+                                     'values': dict(provider.values)}
+        cached = dict(provider.values)
+        provider.executor.shutdown()
+
+        # Подмена API остановлена: новый провайдер стартует с кеша на диске
+        server.shutdown()
+        server.server_close()
+        start = time.perf_counter()
+        provider = make_provider(base, 0)
+        values = provider.get()
+        elapsed = time.perf_counter() - start
+        # Дожидаемся неудачного фонового обновления: оно не затирает кеш
+        provider.executor.shutdown()
+        checks['warm_start'] = {'ok': values == cached and elapsed < args.delay and
+                                provider.values == cached,
+                                'start_ms': round(elapsed * 1000, 1)}
+
+    failed = [name for name, check in checks.items() if not check['ok']]
+    return {'benchmark': 'network', 'delay': args.delay, 'checks': checks,
+            'failed': failed, 'invalid': bool(failed)}
+
+
+# ---------- Kivy: кадры главного цикла во время обновления сетевых данных ----------
+
+def bench_gui(args):
+    """Обновление сетевых данных GUI против медленной подмены API: ни одного зависшего кадра"""
+    # Kivy не должен разбирать аргументы бенчмарка
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    import importlib.util
+    import requests
+    spec = importlib.util.spec_from_file_location(
+        'nerdminer_gui', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'python nerdminer_gui.py'))
+    gui = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gui)
+    from kivy.clock import Clock
+
+    server = serve_fake_api(args.delay)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    class SlowNetworkData(gui.NetworkData):
+        """Тот же update_all, но данные с медленной подмены"""
+
+        def fetch_btc_price(self):
+            self.btc_price = requests.get(f"{base}/price", timeout=args.timeout).json()['bitcoin']['usd']
+            return True
+
+        def fetch_blockchain_data(self):
+            self.block_height = int(requests.get(f"{base}/q/getblockcount", timeout=args.timeout).text)
+            return True
+
+    widget = gui.NerdMinerGUI()
+    widget.network_data = SlowNetworkData()
+    # Итоги замера по каждому обновлению
+    probes = []
+    probe_end = widget.frame_probe.end
+    widget.frame_probe.end = lambda: probes.append(probe_end()) or probes[-1]
+
+    frames = []
+    pressed = False
+    widget.force_network_refresh()
+    start = time.perf_counter()
+    deadline = start + args.delay * 4 + args.timeout
+    while time.perf_counter() < deadline:
+        frame_start = time.perf_counter()
+        Clock.tick()
+        frames.append(time.perf_counter() - frame_start)
+        # R посреди обновления: должно выполниться следом, а не потеряться
+        if not pressed and time.perf_counter() - start > args.delay / 2:
+            widget._on_keyboard_down(None, (114, 'r'), 'r', [])
+            pressed = True
+        if pressed and not widget.network_refreshing and not widget.refresh_pending:
+            break
+    server.shutdown()
+    server.server_close()
+
+    stalls = sum(count for max_frame, count in probes)
+    refreshes = server.requests['/price']
+    label_ok = widget.block_label.text == f"Block: {server.values['block_height']:,}"
+    return {
+        'benchmark': 'gui',
+        'delay': args.delay,
+        'frames': len(frames),
+        'max_frame_ms': round(max(max_frame for max_frame, count in probes) * 1000, 1) if probes else None,
+        'frame_budget_ms': round((gui.FRAME_TIME + gui.FRAME_TOLERANCE) * 1000, 1),
+        'stalls': stalls,
+        'refreshes': refreshes,
+        'invalid': stalls > 0 or refreshes != 2 or len(probes) != 2 or not label_ok,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="NerdMiner benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    http = commands.add_parser('http', help="задержка /api/stats при 1/10/100 клиентах")
+    http.add_argument('--clients', type=int, nargs='+', default=[1, 10, 100])
+    http.add_argument('--duration', type=float, default=5.0)
+    http.add_argument('--port', type=int, default=18080)
+    http.add_argument('--mining', action='store_true', help="майнить во время замера")
+    http.set_defaults(run=bench_http)
+
+    hashing = commands.add_parser('hashing', help="H/s движков хеширования по числу воркеров")
+    hashing.add_argument('--engines', nargs='+', default=None,
+                         help="string, hashlib, numpy, process (по умолчанию все доступные)")
+    hashing.add_argument('--workers', type=int, nargs='+',
+                         default=sorted({1, 2, os.cpu_count() or 1}))
+    hashing.add_argument('--duration', type=float, default=3.0)
+    hashing.add_argument('--repeat', type=int, default=3)
+    hashing.add_argument('--baseline', default=None, help="JSON прошлого прогона для сравнения")
+    hashing.add_argument('--tolerance', type=float, default=TOLERANCE)
+    hashing.add_argument('--save', default=None, help="сохранить результат как базовую линию")
+    hashing.set_defaults(run=bench_hashing)
+
+    scheduler = commands.add_parser('scheduler', help="покрытие nonce без пересечений и цена выдачи диапазона")
+    scheduler.add_argument('--workers', type=int, default=8)
+    scheduler.add_argument('--units', type=int, default=20000, help="диапазонов на поток")
+    scheduler.add_argument('--chunk', type=int, default=1 << 10)
+    scheduler.add_argument('--nonce-space', type=int, default=1 << 16,
+                           help="уменьшенное пространство nonce, чтобы чаще менять заголовок")
+    scheduler.set_defaults(run=bench_scheduler)
+
+    failover = commands.add_parser('failover', help="потери хешей при отказе пула")
+    failover.add_argument('--latency', type=float, nargs='+', default=[0.05, 0.01, 0.1],
+                          help="задержка ответа каждого мок-пула, секунды")
+    failover.add_argument('--modes', nargs='+', choices=['down', 'silent'], default=['down', 'silent'],
+                          help="порядок отказов активного пула")
+    failover.add_argument('--workers', type=int, default=2)
+    failover.add_argument('--difficulty', type=float, default=0.0002)
+    failover.add_argument('--job-interval', type=float, default=2.0)
+    failover.add_argument('--job-timeout', type=float, default=6.0)
+    failover.add_argument('--reply-timeout', type=float, default=3.0)
+    failover.add_argument('--settle', type=float, default=4.0, help="пауза между отказами")
+    failover.set_defaults(run=bench_failover)
+
+    fleet = commands.add_parser('fleet', help="агрегатор против сотен имитированных узлов")
+    fleet.add_argument('--nodes', type=int, nargs='+', default=[100, 500])
+    fleet.add_argument('--interval', type=float, default=1.0, help="период опроса (в проде 5 с)")
+    fleet.add_argument('--duration', type=float, default=10.0)
+    fleet.add_argument('--clients', type=int, default=10, help="клиентов /api/fleet во время опроса")
+    fleet.add_argument('--port', type=int, default=18090)
+    fleet.set_defaults(run=bench_fleet)
+
+    proxy = commands.add_parser('proxy', help="задержка рассылки mining.notify через прокси")
+    proxy.add_argument('--clients', type=int, nargs='+', default=[100, 500])
+    proxy.add_argument('--interval', type=float, default=0.5, help="период новых заданий пула")
+    proxy.add_argument('--duration', type=float, default=10.0)
+    proxy.add_argument('--submit-fraction', type=float, default=0.1, help="доля майнеров, отправляющих шары")
+    proxy.add_argument('--port', type=int, default=13334)
+    proxy.set_defaults(run=bench_proxy)
+
+    thermal = commands.add_parser('thermal', help="термо-регулятор на поддельном sysfs")
+    thermal.add_argument('--workers', type=int, default=4)
+    thermal.add_argument('--target', type=float, default=45.0)
+    thermal.add_argument('--ambient', type=float, default=30.0)
+    thermal.add_argument('--heat', type=float, default=8.0, help="нагрев от воркера на полной мощности, °C")
+    thermal.add_argument('--tau', type=float, default=60.0, help="тепловая постоянная, секунды")
+    thermal.add_argument('--duration', type=float, default=3600, help="модельных секунд (шаг 1 с)")
+    thermal.add_argument('--reads', type=int, default=10000)
+    thermal.set_defaults(run=bench_thermal)
+
+    prefetch = commands.add_parser('prefetch', help="простой воркеров между заданиями с фоновой подготовкой и без")
+    prefetch.add_argument('--workers', type=int, default=2)
+    prefetch.add_argument('--engine', default='hashlib', help="hashlib или numpy")
+    prefetch.add_argument('--batch', type=int, default=256)
+    prefetch.add_argument('--chunk', type=int, default=1 << 14, help="диапазон nonce на смену задания")
+    prefetch.add_argument('--job-interval', type=float, default=0.2, help="период новых заданий пула")
+    prefetch.add_argument('--duration', type=float, default=5.0)
+    prefetch.set_defaults(run=bench_prefetch)
+
+    merkle = commands.add_parser('merkle', help="merkle root в секунду и сверка с блоками mainnet")
+    merkle.add_argument('--branch', type=int, nargs='+', default=[0, 6, 12], help="длины ветки merkle")
+    merkle.add_argument('--coinb1', type=int, default=100, help="байт coinbase до extranonce")
+    merkle.add_argument('--coinb2', type=int, default=150, help="байт coinbase после extranonce")
+    merkle.add_argument('--duration', type=float, default=2.0)
+    merkle.add_argument('--check', type=int, default=1000, help="extranonce2 для сверки со сборкой строками")
+    merkle.set_defaults(run=bench_merkle)
+
+    startup = commands.add_parser('startup', help="время от запуска nerdminer_mine.py до первого хеша")
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--budget', type=float, default=100.0, help="бюджет сверх пустого интерпретатора, мс")
+    startup.set_defaults(run=bench_startup)
+
+    network = commands.add_parser('network', help="кеш и параллельные запросы сетевых данных на подмене API")
+    network.add_argument('--delay', type=float, default=0.2, help="задержка ответа подмены, секунды")
+    network.add_argument('--ttl', type=float, default=60.0)
+    network.add_argument('--gets', type=int, default=10000, help="вызовов get() на свежем кеше")
+    network.set_defaults(run=bench_network)
+
+    gui = commands.add_parser('gui', help="кадры Kivy во время обновления сетевых данных (нужен Kivy)")
+    gui.add_argument('--delay', type=float, default=0.5, help="задержка ответа подмены, секунды")
+    gui.add_argument('--timeout', type=float, default=10.0)
+    gui.set_defaults(run=bench_gui)
+
+    args = parser.parse_args()
+    report = args.run(args)
+    print(json.dumps(report, indent=2))
+
+    # Регрессия должна ломать прогон, а не теряться в выводе
+    for regression in report.get('regressions', []):
+        print(f"❌ REGRESSION {regression['engine']} x{regression['workers']}: "
+              f"{regression['hps']:,} H/s vs {regression['baseline_hps']:,} H/s "
+              f"({regression['change']:+.1%})", file=sys.stderr)
+    if report.get('regressions'):
+        sys.exit(1)
+    if report.get('invalid'):
+        print(f"❌ {report['benchmark'].upper()} check failed", file=sys.stderr)
+        sys.exit(1)
+    if report.get('over_budget'):
+        print(f"❌ STARTUP {report['startup_ms']} ms (budget {report['budget_ms']} ms), "
+              f"heavy imports: {report['heavy_imports']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import threading
+import time
+from datetime import datetime
+
+from nerdminer_hashing import difficulty_to_target, share_difficulty, make_hasher, DEMO_SHARE_TARGET
+from nerdminer_scheduler import WorkScheduler, JobPrefetcher, demo_template, THREAD_CHUNK, PROCESS_CHUNK
+from nerdminer_workers import (ProcessMiner, HashCounters, FLUSH_INTERVAL, PROCESS_BATCH,
+                               PARK_INTERVAL, duty_sleep)
+from nerdminer_thermal import ThermalSensors, ThermalGovernor, SYSFS_ROOT, TARGET_TEMP
+from nerdminer_metrics import Histogram, merge_histograms, BATCH_BUCKETS, SUBMIT_BUCKETS
+
+# Ядро майнинга без интерфейса и HTTP: общее для веб-сервера (nerdminer_v2_android)
+# и headless-майнера (nerdminer_mine). Пул (asyncio) грузится, только если задан.
+
+# Сколько nonce перебирать за один проход воркера-потока
+HASH_BATCH = 256
+# Сколько последних шар помнить для интерфейса
+LAST_SHARES = 5
+# Движки, которым нужна фоновая подготовка заданий: хешер numpy дорогой (первые
+# раунды на пачку), а midstate hashlib дешевле передачи готовой пары между потоками
+PREFETCH_ENGINES = ('numpy',)
+
+
+class MinerCore:
+    """Задания, воркеры (потоки или процессы), шары и термо-регулятор"""
+
+    def __init__(self, backend='threads', workers=None, engine='hashlib', batch=None, duty=1.0,
+                 pool=None, user='android', password='x', min_difficulty=None,
+                 max_temp=TARGET_TEMP, sysfs_root=SYSFS_ROOT):
+        # threads - потоки в этом процессе, processes - пул процессов на все ядра
+        self.backend = backend
+        self.workers = workers
+        # hashlib - midstate через hashlib, numpy - векторный перебор пачками
+        self.engine = engine
+        self.batch = batch or (PROCESS_BATCH if backend == 'processes' else HASH_BATCH)
+        self.duty = duty
+        # Пулы Stratum 'host:port[*вес],...'; без пула майним по локальной цели
+        self.pool = pool
+        self.user = user
+        self.password = password
+        # Локальный порог: шары легче не отправляются, даже если пул принял бы
+        self.min_difficulty = min_difficulty
+
+        self.mining = False
+        # Непересекающиеся диапазоны nonce для всех воркеров
+        self.scheduler = WorkScheduler(PROCESS_CHUNK if backend == 'processes' else THREAD_CHUNK)
+        self.process_miner = None
+        self.prefetcher = None
+        # Простой потоков-воркеров без prefetcher, секунды
+        self.idle = []
+        self.pools = None
+        self.counters = HashCounters(0)
+        # Хеши прошлых запусков (восстановленные из журнала)
+        self.hashes_base = 0
+        self.first_hash = threading.Event()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.best_difficulty = 0.0
+        self.last_shares = []
+        # Гистограммы: длительность пачки по воркерам и задержка ответа пула
+        self.batch_histograms = []
+        self.submit_histogram = Histogram(SUBMIT_BUCKETS)
+
+        # Реальные датчики; регулятор урезает воркеры и duty выше max_temp
+        self.sensors = ThermalSensors(sysfs_root)
+        self.max_temp = max_temp
+        self.governor = None
+        self.active_workers = 0
+        self.active_duty = duty
+
+    def start(self):
+        self.mining = True
+
+        # Без пула - локальный шаблон, с пулом шаблон придет с mining.notify
+        if self.pool:
+            from nerdminer_pools import PoolManager, parse_pools
+            self.scheduler.set_template(None)
+            self.pools = PoolManager(parse_pools(self.pool), self.user, self.password,
+                                     on_job=self.on_pool_job, on_result=self.on_share_result)
+            self.pools.start()
+        else:
+            self.scheduler.set_template(demo_template(self.share_target(DEMO_SHARE_TARGET)))
+
+        # У каждого воркера свой слот счетчика и гистограмма пачек
+        if self.backend == 'processes':
+            self.process_miner = ProcessMiner(self.scheduler, workers=self.workers, batch=self.batch,
+                                              engine=self.engine, duty=self.duty,
+                                              on_hashes=self.on_process_hashes,
+                                              on_share=self.on_process_share)
+            workers = self.process_miner.workers
+            self.counters = HashCounters(workers)
+            self.batch_histograms = [Histogram(BATCH_BUCKETS) for _ in range(workers)]
+            self.start_governor(workers)
+            self.process_miner.start()
+        else:
+            workers = self.workers or 2
+            self.counters = HashCounters(workers)
+            self.batch_histograms = [Histogram(BATCH_BUCKETS) for _ in range(workers)]
+            self.idle = [0.0] * workers
+            self.start_governor(workers)
+            # Для numpy задания и хешеры готовятся в фоне, воркер только берет готовое
+            self.prefetcher = None
+            if self.engine in PREFETCH_ENGINES:
+                self.prefetcher = JobPrefetcher(self.scheduler, workers, self.engine)
+            for i in range(workers):
+                threading.Thread(target=self.mine_worker, args=(i,), name=f'mine-{i}',
+                                 daemon=True).start()
+            # Воркеры уже ждут в очередях и не отнимают GIL у запуска потоков
+            if self.prefetcher:
+                self.prefetcher.start()
+
+    def stop(self):
+        self.mining = False
+        if self.process_miner:
+            self.process_miner.stop()
+            self.process_miner = None
+        if self.prefetcher:
+            self.prefetcher.stop()
+        if self.pools:
+            self.pools.stop()
+
+    def mine_worker(self, index):
+        local_hashes = 0
+        last_flush_time = time.time()
+        durations = self.batch_histograms[index]
+
+        job = None
+        batch = self.batch
+        nonce = end = 0
+        # Без prefetcher: начало ожидания задания и было ли уже первое
+        wait_since = None
+        started = False
+
+        while self.mining:
+            if index >= self.active_workers:
+                # Отключен термо-регулятором
+                time.sleep(PARK_INTERVAL)
+                continue
+
+            # Новое задание от пула или исчерпан свой диапазон nonce
+            prefetcher = self.prefetcher
+            generation = prefetcher.generation if prefetcher else self.scheduler.generation
+            if job is None or job['generation'] != generation or nonce >= end:
+                if prefetcher:
+                    # Следующее задание с готовым хешером уже ждет в очереди воркера
+                    prepared = prefetcher.take(index, timeout=0.1)
+                    if prepared is None:
+                        job = None
+                        continue
+                    job, hasher = prepared
+                else:
+                    if wait_since is None:
+                        wait_since = time.perf_counter()
+                    work = self.scheduler.next_work()
+                    if work is None:
+                        job = None
+                        time.sleep(0.1)
+                        continue
+                    # Midstate считается один раз на заголовок, дальше меняется только nonce
+                    if job is None or work['header'] != job['header']:
+                        hasher = make_hasher(work['header'], self.engine)
+                    # Ожидание первого задания - это старт, а не простой
+                    if started:
+                        self.idle[index] += time.perf_counter() - wait_since
+                    started = True
+                    wait_since = None
+                    job = work
+                batch = max(self.batch, hasher.min_batch)
+                nonce, end = job['nonce_start'], job['nonce_end']
+
+            count = min(batch, end - nonce)
+            batch_start = time.perf_counter()
+            found = hasher.scan(nonce, count, job['target'])
+            busy = time.perf_counter() - batch_start
+            durations.observe(busy)
+            nonce += count
+            local_hashes += count
+            if not self.first_hash.is_set():
+                self.first_hash.set()
+
+            # Найден шар (хеш ниже цели)
+            for share_nonce, digest in found:
+                self.submit_share(job, share_nonce, digest)
+
+            # Сброс локального счетчика в свой слот пачками
+            current_time = time.time()
+            if current_time - last_flush_time >= FLUSH_INTERVAL:
+                self.counters.add(index, local_hashes)
+                local_hashes = 0
+                last_flush_time = current_time
+
+            # Вместо фиксированной паузы - доля времени работы (duty cycle)
+            duty_sleep(busy, self.active_duty)
+
+        self.counters.add(index, local_hashes)
+
+    def share_target(self, pool_target):
+        """Цель шар: целевая пула, ужесточенная локальной минимальной сложностью"""
+        if self.min_difficulty:
+            return min(pool_target, difficulty_to_target(self.min_difficulty))
+        return pool_target
+
+    def on_pool_job(self, template):
+        # Потоки заберут новое задание на следующей пачке, процессам раздаем сразу
+        template = dict(template, target=self.share_target(template['target']))
+        self.scheduler.set_template(template)
+        if self.process_miner:
+            self.process_miner.dispatch()
+        if self.prefetcher:
+            self.prefetcher.refresh()
+
+    def submit_share(self, job, nonce, digest):
+        if self.pools:
+            self.pools.submit(job, nonce, digest)
+        else:
+            self.record_share(digest)
+
+    def on_share_result(self, accepted, error, digest, latency):
+        """Ответ пула на mining.submit"""
+        self.submit_histogram.observe(latency)
+        if accepted:
+            self.record_share(digest)
+        else:
+            self.rejected += 1
+            print(f"Share rejected: {error}")
+
+    def record_share(self, digest):
+        difficulty = share_difficulty(digest)
+        self.accepted += 1
+        self.best_difficulty = max(self.best_difficulty, difficulty)
+        self.last_shares.append({
+            'time': datetime.now().strftime("%H:%M:%S"),
+            'diff': float(f"{difficulty:.4g}")
+        })
+        if len(self.last_shares) > LAST_SHARES:
+            self.last_shares.pop(0)
+
+    def on_process_hashes(self, index, count, durations):
+        self.counters.add(index, count)
+        self.batch_histograms[index].add(*durations)
+        if not self.first_hash.is_set():
+            self.first_hash.set()
+
+    def on_process_share(self, index, job, nonce, digest):
+        self.submit_share(job, nonce, digest)
+
+    def total_hashes(self):
+        return self.hashes_base + self.counters.total()
+
+    def worker_idle(self):
+        """Простой воркеров между заданиями, секунды"""
+        if self.process_miner:
+            return list(self.process_miner.idle)
+        if self.prefetcher:
+            return list(self.prefetcher.idle)
+        return list(self.idle)
+
+    def start_governor(self, workers):
+        self.governor = ThermalGovernor(workers, self.duty, target=self.max_temp)
+        self.active_workers = workers
+        self.active_duty = self.duty
+
+    def apply_thermal(self, temperature):
+        """Новая температура в регулятор; при изменении - воркерам"""
+        if not self.governor or not self.governor.update(temperature):
+            return
+        self.active_workers = self.governor.active_workers
+        self.active_duty = self.governor.duty
+        if self.process_miner:
+            self.process_miner.set_active(self.active_workers)
+            self.process_miner.set_duty(self.active_duty)
+        print(f"🌡️ {temperature:.1f}°C: {self.active_workers} workers, duty {self.active_duty:.2f}")
+
+    def write_metrics(self, writer):
+        """Метрики ядра в MetricsWriter; HTTP и остальное - у вызывающего"""
+        writer.metric('nerdminer_hashes_total', 'counter', "Hashes computed", self.total_hashes())
+        writer.metric('nerdminer_shares_total', 'counter', "Shares by pool verdict", [
+            ({'result': 'accepted'}, self.accepted),
+            ({'result': 'rejected'}, self.rejected),
+        ])
+        writer.metric('nerdminer_hashrate', 'gauge', "Smoothed hashrate, H/s", self.counters.ewma)
+        writer.metric('nerdminer_worker_hashrate', 'gauge', "Hashrate per worker, H/s",
+                      [({'worker': i}, rate) for i, rate in enumerate(self.counters.rates)])
+        writer.metric('nerdminer_worker_idle_seconds_total', 'counter', "Time a worker waited between jobs",
+                      [({'worker': i}, idle) for i, idle in enumerate(self.worker_idle())])
+        writer.metric('nerdminer_temperature_celsius', 'gauge', "Device temperature by sensor",
+                      [({'sensor': name}, value) for name, value in self.sensors.values.items()])
+        if self.governor:
+            writer.metric('nerdminer_thermal_active_workers', 'gauge', "Workers left running by the thermal governor",
+                          self.active_workers)
+            writer.metric('nerdminer_thermal_duty', 'gauge', "Duty cycle set by the thermal governor",
+                          self.active_duty)
+        writer.histogram('nerdminer_hash_batch_duration_seconds', "Time to hash one batch",
+                         merge_histograms(self.batch_histograms, BATCH_BUCKETS))
+        writer.histogram('nerdminer_share_submit_latency_seconds', "Pool reply time for mining.submit",
+                         self.submit_histogram)
+        if self.pools:
+            pools = self.pools.pools
+            writer.metric('nerdminer_pool_active', 'gauge', "1 for the pool currently mined on",
+                          [({'pool': pool.name}, int(pool is self.pools.active)) for pool in pools])
+            writer.metric('nerdminer_pool_connect_seconds', 'gauge', "Connect + subscribe round trip",
+                          [({'pool': pool.name}, pool.connect_time) for pool in pools
+                           if pool.connect_time is not None])
+            writer.metric('nerdminer_pool_submit_rtt_seconds', 'gauge', "Smoothed mining.submit round trip",
+                          [({'pool': pool.name}, pool.submit_rtt) for pool in pools
+                           if pool.submit_rtt is not None])
+            writer.metric('nerdminer_pool_failovers_total', 'counter', "Switches away from a failed pool",
+                          len(self.pools.failovers))
+        writer.histogram('nerdminer_scheduler_duration_seconds', "Time to hand out one nonce range",
+                         self.scheduler.durations)
+        writer.metric('nerdminer_scheduler_headers_total', 'counter',
+                      "Headers built (extranonce2/ntime roll, merkle root recomputed)",
+                      self.scheduler.headers)
+        writer.metric('nerdminer_scheduler_ntime_rolls_total', 'counter',
+                      "ntime increments after extranonce2 space ran out",
+                      self.scheduler.ntime_rolls)
@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import collections
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+
+from nerdminer_timeseries import TimeSeriesStore, RESOLUTIONS
+from nerdminer_metrics import MetricsWriter, CONTENT_TYPE
+
+POLL_INTERVAL = 5
+POLL_TIMEOUT = 3
+# Одновременных запросов к узлам за цикл
+MAX_IN_FLIGHT = 256
+# История узла легче общей: минуты за сутки и часы за неделю
+NODE_RESOLUTIONS = {
+    '1m': (60, 1440),
+    '1h': (3600, 7 * 24),
+}
+CYCLE_HISTORY = 100
+REQUEST_TIMEOUT = 10
+# Порт веб-интерфейса майнера, если у узла он не указан
+NODE_PORT = 8080
+
+
+def parse_nodes(spec):
+    """'host[:port],...' или файл со строками host[:port] -> [(host, port)]"""
+    try:
+        with open(spec) as f:
+            items = f.read().split()
+    except OSError:
+        items = spec.split(',')
+    nodes = []
+    for item in items:
+        # Пустые элементы (лишняя запятая) пропускаем, без порта - NODE_PORT
+        host, _, port = item.strip().partition(':')
+        if host:
+            nodes.append((host, int(port or NODE_PORT)))
+    return nodes
+
+
+class FleetNode:
+    """Один телефон: keep-alive соединение, последний снимок и история хешрейта"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.name = f"{host}:{port}"
+        self.request = f"GET /api/stats HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+        self.reader = None
+        self.writer = None
+
+        self.up = False
+        self.stats = {}
+        self.last_seen = 0.0
+        self.latency = 0.0
+        self.errors = 0
+        self.history = TimeSeriesStore(NODE_RESOLUTIONS)
+
+    async def fetch(self):
+        """Снимок /api/stats узла по постоянному соединению"""
+        if self.writer is not None:
+            try:
+                return await self.request_stats()
+            except (OSError, EOFError, asyncio.IncompleteReadError):
+                # Узел закрыл простаивавшее соединение - одна попытка с новым
+                self.close()
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return await self.request_stats()
+
+    async def request_stats(self):
+        self.writer.write(self.request)
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.split(b'\r\n')
+        if b' 200 ' not in lines[0]:
+            raise ValueError(lines[0].decode(errors='replace'))
+        length = 0
+        close = False
+        for line in lines[1:]:
+            key, _, value = line.partition(b':')
+            key = key.strip().lower()
+            if key == b'content-length':
+                length = int(value)
+            elif key == b'connection' and value.strip().lower() == b'close':
+                close = True
+        body = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return json.loads(body)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    def status(self):
+        return {
+            'node': self.name,
+            'up': self.up,
+            'mining': self.stats.get('mining', False),
+            'hash_rate': self.stats.get('hash_rate', 0) if self.up else 0,
+            'total_hashes': self.stats.get('total_hashes', 0),
+            'accepted_shares': self.stats.get('accepted_shares', 0),
+            'rejected_shares': self.stats.get('rejected_shares', 0),
+            'uptime': self.stats.get('uptime', ''),
+            'last_seen': self.last_seen,
+            'latency_ms': round(self.latency * 1000, 1),
+            'errors': self.errors,
+        }
+
+
+class FleetAggregator:
+    """Опрос N узлов в одном asyncio-цикле; итоги собираются раз в цикл"""
+
+    def __init__(self, nodes, interval=POLL_INTERVAL, timeout=POLL_TIMEOUT,
+                 max_in_flight=MAX_IN_FLIGHT):
+        self.nodes = [FleetNode(host, port) for host, port in nodes]
+        self.by_name = {node.name: node for node in self.nodes}
+        self.interval = interval
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+
+        self.running = False
+        self.history = TimeSeriesStore()
+        self.cycles = collections.deque(maxlen=CYCLE_HISTORY)
+        self.polls = 0
+        # Процессорное время потока опроса: цена сотен узлов на одном ядре
+        self.cpu_seconds = 0.0
+        # Готовые ответы: запросы к API не трогают узлы и не считают итоги
+        self.summary = {}
+        self.snapshot = b'{}'
+        self.metrics = b''
+        self.summarize()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.run()),
+                                       name='fleet', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        try:
+            while self.running:
+                cycle_start = time.perf_counter()
+                cpu_start = time.thread_time()
+                await asyncio.gather(*(self.poll(node, semaphore) for node in self.nodes))
+                elapsed = time.perf_counter() - cycle_start
+                self.cycles.append(elapsed)
+                self.summarize()
+                self.cpu_seconds += time.thread_time() - cpu_start
+                await asyncio.sleep(max(0.0, self.interval - elapsed))
+        finally:
+            for node in self.nodes:
+                node.close()
+
+    async def poll(self, node, semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                stats = await asyncio.wait_for(node.fetch(), timeout=self.timeout)
+            except (OSError, ValueError, EOFError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                node.close()
+                node.up = False
+                node.errors += 1
+                return
+            now = time.time()
+            node.latency = time.perf_counter() - start
+            node.stats = stats
+            node.up = True
+            node.last_seen = now
+            node.history.add(now, stats.get('hash_rate', 0))
+            self.polls += 1
+
+    def summarize(self):
+        nodes = [node.status() for node in self.nodes]
+        up = [node for node in nodes if node['up']]
+        totals = {
+            'nodes': len(nodes),
+            'nodes_up': len(up),
+            'mining': sum(1 for node in up if node['mining']),
+            'hash_rate': sum(node['hash_rate'] for node in up),
+            'total_hashes': sum(node['total_hashes'] for node in nodes),
+            'accepted_shares': sum(node['accepted_shares'] for node in nodes),
+            'rejected_shares': sum(node['rejected_shares'] for node in nodes),
+            'cycle_ms': round(self.cycles[-1] * 1000, 1) if self.cycles else 0.0,
+        }
+        if self.running:
+            self.history.add(time.time(), totals['hash_rate'])
+        self.summary = {'totals': totals, 'nodes': nodes}
+        self.snapshot = json.dumps(self.summary).encode()
+        self.metrics = self.render_metrics(totals, nodes)
+
+    def render_metrics(self, totals, nodes):
+        writer = MetricsWriter()
+        writer.metric('nerdminer_fleet_nodes', 'gauge', "Nodes by reachability", [
+            ({'state': 'up'}, totals['nodes_up']),
+            ({'state': 'down'}, totals['nodes'] - totals['nodes_up']),
+        ])
+        writer.metric('nerdminer_fleet_hashrate', 'gauge', "Fleet hashrate, H/s", totals['hash_rate'])
+        writer.metric('nerdminer_fleet_hashes_total', 'counter', "Hashes across the fleet",
+                      totals['total_hashes'])
+        writer.metric('nerdminer_fleet_shares_total', 'counter', "Shares by pool verdict", [
+            ({'result': 'accepted'}, totals['accepted_shares']),
+            ({'result': 'rejected'}, totals['rejected_shares']),
+        ])
+        writer.metric('nerdminer_node_hashrate', 'gauge', "Hashrate per node, H/s",
+                      [({'node': node['node']}, node['hash_rate']) for node in nodes])
+        writer.metric('nerdminer_node_up', 'gauge', "1 if the last poll succeeded",
+                      [({'node': node['node']}, int(node['up'])) for node in nodes])
+        writer.metric('nerdminer_fleet_cycle_seconds', 'gauge', "Duration of the last poll cycle",
+                      self.cycles[-1] if self.cycles else 0.0)
+        writer.metric('nerdminer_fleet_poll_cpu_seconds_total', 'counter', "CPU time spent polling",
+                      self.cpu_seconds)
+        return writer.render()
+
+    def get_history(self, resolution, since=0, node=None):
+        history = self.by_name[node].history if node else self.history
+        return {
+            'node': node,
+            'resolution': resolution,
+            'fields': ['time', 'min', 'max', 'mean'],
+            'points': history.query(resolution, since)
+        }
+
+
+class FleetServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class FleetHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = REQUEST_TIMEOUT
+    disable_nagle_algorithm = True
+
+    def __init__(self, *args, **kwargs):
+        self.fleet = kwargs.pop('fleet')
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+
+        if url.path == '/':
+            self.send_body(FLEET_PAGE.encode(), 'text/html; charset=utf-8')
+        elif url.path == '/api/fleet':
+            self.send_body(self.fleet.snapshot, 'application/json')
+        elif url.path == '/api/history':
+            self.serve_history(query)
+        elif url.path == '/metrics':
+            self.send_body(self.fleet.metrics, CONTENT_TYPE)
+        else:
+            self.send_error(404)
+
+    def serve_history(self, query):
+        node = query.get('node', [None])[0]
+        if node is not None and node not in self.fleet.by_name:
+            self.send_error(404, "unknown node")
+            return
+        resolutions = NODE_RESOLUTIONS if node else RESOLUTIONS
+        resolution = query.get('resolution', ['1m'])[0]
+        if resolution not in resolutions:
+            self.send_error(400, f"resolution must be one of {', '.join(resolutions)}")
+            return
+        try:
+            since = float(query.get('since', ['0'])[0])
+        except ValueError:
+            self.send_error(400, "since must be a unix timestamp")
+            return
+        self.send_body(json.dumps(self.fleet.get_history(resolution, since, node)).encode(),
+                       'application/json')
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+FLEET_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>NerdMiner Fleet</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body { font-family: 'Courier New', monospace; background: #0a0a0a; color: #00ff00;
+               padding: 10px; line-height: 1.4; }
+        .header { text-align: center; border-bottom: 1px solid #00ff00; padding: 10px 0; margin-bottom: 10px; }
+        .totals { display: flex; flex-wrap: wrap; gap: 20px; margin-bottom: 15px; }
+        table { width: 100%; border-collapse: collapse; font-size: 13px; }
+        th, td { text-align: right; padding: 3px 6px; border-bottom: 1px solid #003300; }
+        th:first-child, td:first-child { text-align: left; }
+        .down { color: #ff3333; }
+    </style>
+</head>
+<body>
+    <div class="header">NERDMINER FLEET</div>
+    <div class="totals" id="totals"></div>
+    <table>
+        <thead><tr><th>Node</th><th>Hashrate</th><th>Hashes</th><th>Shares</th><th>Uptime</th><th>Ping</th></tr></thead>
+        <tbody id="nodes"></tbody>
+    </table>
+    <script>
+        function update() {
+            fetch('/api/fleet').then(r => r.json()).then(data => {
+                const t = data.totals;
+                document.getElementById('totals').innerHTML = `
+                    <span>Nodes: ${t.nodes_up}/${t.nodes}</span>
+                    <span>Mining: ${t.mining}</span>
+                    <span>Hashrate: ${t.hash_rate.toLocaleString()} H/s</span>
+                    <span>Shares: ${t.accepted_shares}/${t.rejected_shares}</span>`;
+                document.getElementById('nodes').innerHTML = data.nodes.map(n => `
+                    <tr class="${n.up ? '' : 'down'}">
+                        <td>${n.node}</td>
+                        <td>${n.hash_rate.toLocaleString()} H/s</td>
+                        <td>${n.total_hashes.toLocaleString()}</td>
+                        <td>${n.accepted_shares}/${n.rejected_shares}</td>
+                        <td>${n.uptime}</td>
+                        <td>${n.up ? n.latency_ms + ' ms' : 'down'}</td>
+                    </tr>`).join('');
+            });
+        }
+        update();
+        setInterval(update, 5000);
+    </script>
+</body>
+</html>
+"""
+
+
+def make_fleet_server(fleet, port, host=''):
+    handler = lambda *args: FleetHandler(*args, fleet=fleet)
+    return FleetServer((host, port), handler)
+
+
+def run_fleet(nodes, port=8090, interval=POLL_INTERVAL):
+    fleet = FleetAggregator(nodes, interval=interval)
+    fleet.start()
+    with make_fleet_server(fleet, port) as httpd:
+        print(f"🛰️ NerdMiner Fleet: {len(fleet.nodes)} nodes, http://localhost:{port}")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Fleet stopped!")
+        finally:
+            fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NerdMiner fleet aggregator")
+    parser.add_argument('nodes', help="host:port через запятую или файл со списком")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+    run_fleet(parse_nodes(args.nodes), args.port, args.interval)
+
+
+if __name__ == '__main__':
+    main()
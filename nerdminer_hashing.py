@@ -0,0 +1,418 @@
+import hashlib
+import importlib.util
+import os
+import struct
+import time
+
+# numpy грузится только для движка numpy: импорт дороже всего остального старта
+np = None
+
+# Цель для сложности 1 (как считают пулы)
+DIFF1_TARGET = 0xFFFF << 208
+MAX_NONCE = 0xFFFFFFFF
+
+# Без пула майним по локальной цели: ~1 шар на 1000 хешей
+DEMO_SHARE_TARGET = (1 << 256) // 1000
+DEMO_BITS = 0x1d00ffff
+
+_nonce_pack = struct.Struct('<I').pack
+
+# Известные заголовки mainnet (header hex, block hash hex) для самопроверки движков
+KNOWN_HEADERS = [
+    # Генезис-блок
+    ('0100000000000000000000000000000000000000000000000000000000000000'
+     '000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa'
+     '4b1e5e4a29ab5f49ffff001d1dac2b7c',
+     '000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f'),
+    # Блок 100000
+    ('0100000050120119172a610421a6c3011dd330d9df07b63616c2cc1f1cd00200'
+     '000000006657a9252aacd5c0b2940996ecff952228c3067cc38d4885efb5a4ac'
+     '4247e9f337221b4d4c86041b0f2b5710',
+     '000000000003ba27aa200b1cecaad478d2b00432346c3f1f3986da1afd33e506'),
+]
+
+# Известные merkle root mainnet (display hex) для самопроверки MerkleBuilder
+# Генезис-блок: единственная транзакция - coinbase, ветка пустая
+GENESIS_COINBASE = (
+    '01000000010000000000000000000000000000000000000000000000000000000000000000ffffffff'
+    '4d04ffff001d0104455468652054696d65732030332f4a616e2f32303039204368616e63656c6c6f72'
+    '206f6e206272696e6b206f66207365636f6e64206261696c6f757420666f722062616e6b73ffffffff'
+    '0100f2052a01000000434104678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f'
+    '61deb649f6bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac00000000')
+GENESIS_MERKLE_ROOT = '4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b'
+# Блок 100000: txid по порядку (первый - coinbase) и merkle root
+BLOCK_100000_TXIDS = [
+    '8c14f0db3df150123e6f3dbbf30f8b955a8249b62ac1d1ff16284aefa3d06d87',
+    'fff2525b8931402dd09222c50775608f75787bd2b87e56995a7bdd30f79702c4',
+    '6359f0868171b1d194cbee1af2f16ea598ae8fad666d9b012c8ed2b79a236ec4',
+    'e9a66845e05d5abc0ad04ec80f774a7e585c6e8db975962d069a522137b80c1d',
+]
+BLOCK_100000_MERKLE_ROOT = 'f3e94742aca4b5ef85488dc37c06c3282295ffec960994b2c0d5ac2a25a95766'
+
+# Константы SHA-256
+_K = [
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+]
+_IV = [0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19]
+_M32 = 0xFFFFFFFF
+
+
+def double_sha256(data):
+    """Двойной SHA-256"""
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def bits_to_target(bits):
+    """Цель из компактного поля nBits"""
+    exponent = bits >> 24
+    mantissa = bits & 0xFFFFFF
+    return mantissa << (8 * (exponent - 3))
+
+
+def difficulty_to_target(difficulty):
+    """Цель для сложности шары"""
+    return min(int(DIFF1_TARGET / difficulty), (1 << 256) - 1)
+
+
+def target_to_difficulty(target):
+    """Сложность для цели"""
+    return DIFF1_TARGET / max(target, 1)
+
+
+def share_difficulty(digest):
+    """Фактическая сложность шары: хеш как little-endian число против DIFF1"""
+    return target_to_difficulty(int.from_bytes(digest, 'little'))
+
+
+def build_header(version, prev_hash, merkle_root, ntime, bits, nonce=0):
+    """Сборка 80-байтного заголовка блока"""
+    return (struct.pack('<I', version) + prev_hash + merkle_root +
+            struct.pack('<III', ntime, bits, nonce))
+
+
+def swap_words(data):
+    """Разворот байтов внутри каждого 4-байтного слова (формат prevhash в Stratum)"""
+    return b''.join(data[i:i + 4][::-1] for i in range(0, len(data), 4))
+
+
+def header_from_notify(notify, extranonce1, extranonce2, ntime=None):
+    """80-байтный заголовок (nonce = 0) из параметров mining.notify
+
+    Разовая сборка (проверка шары пулом); для перебора extranonce2 - MerkleBuilder.
+    """
+    coinb1, coinb2, branch = notify[2:5]
+    coinbase = bytes.fromhex(coinb1) + extranonce1 + extranonce2 + bytes.fromhex(coinb2)
+    root = double_sha256(coinbase)
+    for h in branch:
+        root = double_sha256(root + bytes.fromhex(h))
+    return notify_header(notify, root, ntime)
+
+
+def merkle_branch(hashes):
+    """Ветка merkle для coinbase из хешей остальных транзакций (внутренний порядок байтов)"""
+    branch = []
+    level = [None] + list(hashes)
+    while len(level) > 1:
+        branch.append(level[1])
+        # Нечетный уровень - последний хеш в паре сам с собой
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [None] + [double_sha256(level[i] + level[i + 1]) for i in range(2, len(level), 2)]
+    return branch
+
+
+class MerkleBuilder:
+    """Merkle root по extranonce2 для одного mining.notify
+
+    Ветка хранится байтами, coinbase1 + extranonce1 + extranonce2 + coinbase2
+    собирается в один заранее выделенный буфер: на каждый root меняются только
+    байты extranonce2. SHA-256 неизменного начала (coinbase1 + extranonce1)
+    считается один раз, дальше копируется. Двойных SHA-256 на root - одно на
+    coinbase и по одному на уровень ветки, меньше не бывает.
+    Буфер общий: вызывать из одного потока (планировщик - под своей блокировкой).
+    """
+
+    def __init__(self, coinb1, extranonce1, coinb2, branch, extranonce2_size):
+        prefix = bytes(coinb1) + bytes(extranonce1)
+        self.offset = len(prefix)
+        self.size = extranonce2_size
+        self.buffer = bytearray(prefix + bytes(extranonce2_size) + bytes(coinb2))
+        # Пока есть memoryview, bytearray нельзя случайно удлинить не тем extranonce2
+        self.suffix = memoryview(self.buffer)[self.offset:]
+        self.prefix_hash = hashlib.sha256(prefix)
+        self.branch = [bytes(h) for h in branch]
+
+    @classmethod
+    def from_notify(cls, notify, extranonce1, extranonce2_size):
+        return cls(bytes.fromhex(notify[2]), extranonce1, bytes.fromhex(notify[3]),
+                   [bytes.fromhex(h) for h in notify[4]], extranonce2_size)
+
+    def set_extranonce2(self, extranonce2):
+        """extranonce2 - bytes или int (big-endian, как hex в mining.submit)"""
+        if isinstance(extranonce2, int):
+            extranonce2 = extranonce2.to_bytes(self.size, 'big')
+        self.suffix[:self.size] = extranonce2
+
+    def coinbase(self, extranonce2):
+        self.set_extranonce2(extranonce2)
+        return bytes(self.buffer)
+
+    def root(self, extranonce2):
+        """Merkle root (внутренний порядок байтов, как в заголовке)"""
+        self.set_extranonce2(extranonce2)
+        inner = self.prefix_hash.copy()
+        inner.update(self.suffix)
+        return self.fold(hashlib.sha256(inner.digest()).digest())
+
+    def fold(self, digest):
+        """Подъем хеша coinbase по ветке до корня"""
+        sha256 = hashlib.sha256
+        for h in self.branch:
+            # 64 байта конкатенацией быстрее, чем запись в готовый буфер
+            digest = sha256(sha256(digest + h).digest()).digest()
+        return digest
+
+
+def notify_header(notify, merkle_root, ntime=None):
+    """80-байтный заголовок (nonce = 0) из mining.notify и готового merkle root"""
+    return (bytes.fromhex(notify[5])[::-1] +
+            swap_words(bytes.fromhex(notify[1])) +
+            merkle_root +
+            bytes.fromhex(ntime or notify[7])[::-1] +
+            bytes.fromhex(notify[6])[::-1] +
+            bytes(4))
+
+
+def demo_header():
+    """Заголовок-заглушка для майнинга без пула"""
+    return build_header(0x20000000, os.urandom(32), os.urandom(32),
+                        int(time.time()), DEMO_BITS)
+
+
+class HeaderHasher:
+    """Хеширование 80-байтного заголовка с предвычисленным midstate"""
+
+    min_batch = 1
+
+    def __init__(self, header):
+        # Первые 64 байта хешируются один раз на задание
+        self.midstate = hashlib.sha256(header[:64])
+        # Остаток без nonce: конец merkle root, время, nBits
+        self.tail = header[64:76]
+
+    def hash_nonce(self, nonce):
+        """Двойной SHA-256 заголовка с заданным nonce"""
+        h = self.midstate.copy()
+        h.update(self.tail + _nonce_pack(nonce))
+        return hashlib.sha256(h.digest()).digest()
+
+    def scan(self, start, count, target):
+        """Перебор count nonce начиная со start, возвращает [(nonce, digest)] под цель"""
+        found = []
+        copy = self.midstate.copy
+        tail = self.tail
+        sha256 = hashlib.sha256
+        from_bytes = int.from_bytes
+        # Старший байт хеша (последний в little-endian) отсекает почти всё без int
+        top = target >> 248
+
+        for nonce in range(start, start + count):
+            h = copy()
+            h.update(tail + _nonce_pack(nonce))
+            digest = sha256(h.digest()).digest()
+            if digest[31] <= top and from_bytes(digest, 'little') <= target:
+                found.append((nonce, digest))
+        return found
+
+
+def _rotr(x, n):
+    return ((x >> n) | (x << (32 - n))) & _M32
+
+
+def _round(state, k, w):
+    """Один раунд SHA-256 на целых Python"""
+    a, b, c, d, e, f, g, h = state
+    s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+    ch = (e & f) ^ (~e & g)
+    t1 = (h + s1 + ch + k + w) & _M32
+    s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+    maj = (a & b) ^ (a & c) ^ (b & c)
+    return [(t1 + s0 + maj) & _M32, a, b, c, (d + t1) & _M32, e, f, g]
+
+
+def sha256_compress(state, block):
+    """Сжатие одного 64-байтного блока, возвращает новое состояние (8 слов)"""
+    w = list(struct.unpack('>16I', block))
+    for i in range(16, 64):
+        s0 = _rotr(w[i - 15], 7) ^ _rotr(w[i - 15], 18) ^ (w[i - 15] >> 3)
+        s1 = _rotr(w[i - 2], 17) ^ _rotr(w[i - 2], 19) ^ (w[i - 2] >> 10)
+        w.append((w[i - 16] + s0 + w[i - 7] + s1) & _M32)
+
+    work = list(state)
+    for i in range(64):
+        work = _round(work, _K[i], w[i])
+    return [(x + y) & _M32 for x, y in zip(state, work)]
+
+
+def _np_rotr(x, n):
+    return (x >> n) | (x << (32 - n))
+
+
+def _np_compress(state, w, first_round=0):
+    """Сжатие SHA-256 над массивами uint32: state и w - списки массивов"""
+    w = list(w)
+    for i in range(16, 64):
+        x, y = w[i - 15], w[i - 2]
+        s0 = _np_rotr(x, 7) ^ _np_rotr(x, 18) ^ (x >> 3)
+        s1 = _np_rotr(y, 17) ^ _np_rotr(y, 19) ^ (y >> 10)
+        w.append(w[i - 16] + s0 + w[i - 7] + s1)
+
+    a, b, c, d, e, f, g, h = state
+    for i in range(first_round, 64):
+        s1 = _np_rotr(e, 6) ^ _np_rotr(e, 11) ^ _np_rotr(e, 25)
+        ch = (e & f) ^ (~e & g)
+        t1 = h + s1 + ch + _NP_K[i] + w[i]
+        s0 = _np_rotr(a, 2) ^ _np_rotr(a, 13) ^ _np_rotr(a, 22)
+        maj = (a & b) ^ (a & c) ^ (b & c)
+        h, g, f, e, d, c, b, a = g, f, e, d + t1, c, b, a, t1 + s0 + maj
+    return [a, b, c, d, e, f, g, h]
+
+
+def _load_numpy():
+    """Импорт numpy при первом использовании; False, если его нет"""
+    global np, _NP_K
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        _NP_K = numpy.array(_K, dtype=numpy.uint32)
+        np = numpy
+    return True
+
+
+def _np_word(value):
+    # Массив из одного элемента: переполнение uint32 в массивах не шумит
+    return np.array([value], dtype=np.uint32)
+
+
+class NumpyHeaderHasher:
+    """Векторный перебор: пачка nonce за одно сжатие SHA-256 над массивами uint32"""
+
+    min_batch = 8192
+
+    def __init__(self, header):
+        if not _load_numpy():
+            raise RuntimeError("numpy engine requires numpy")
+        self.midstate = sha256_compress(_IV, header[:64])
+        self.tail = list(struct.unpack('>3I', header[64:76]))
+
+        # Первые 3 раунда второго блока не зависят от nonce
+        state = self.midstate
+        for i in range(3):
+            state = _round(state, _K[i], self.tail[i])
+        self.prefix_state = [_np_word(x) for x in state]
+
+        # Второй блок: хвост, nonce, паддинг и длина 640 бит
+        self.block_words = [_np_word(x) for x in self.tail]
+        self.padding = [_np_word(0x80000000)] + [_np_word(0)] * 10 + [_np_word(640)]
+        # Второй хеш: 32 байта дайджеста, паддинг и длина 256 бит
+        self.second_padding = [_np_word(0x80000000)] + [_np_word(0)] * 6 + [_np_word(256)]
+        self.iv = [_np_word(x) for x in _IV]
+
+    def hash_words(self, nonces):
+        """Итоговые слова дайджеста (8 массивов) для массива nonce"""
+        nonce_words = nonces.astype(np.uint32).byteswap()
+        first = _np_compress(self.prefix_state,
+                             self.block_words + [nonce_words] + self.padding,
+                             first_round=3)
+        first = [x + y for x, y in zip(first, [_np_word(v) for v in self.midstate])]
+        second = _np_compress(self.iv, first + self.second_padding)
+        return [x + y for x, y in zip(second, self.iv)]
+
+    def hash_nonce(self, nonce):
+        """Двойной SHA-256 заголовка с заданным nonce"""
+        words = self.hash_words(np.array([nonce], dtype=np.int64))
+        return struct.pack('>8I', *(int(w[0]) for w in words))
+
+    def scan(self, start, count, target):
+        """Перебор count nonce начиная со start, возвращает [(nonce, digest)] под цель"""
+        nonces = np.arange(start, start + count, dtype=np.int64)
+        words = self.hash_words(nonces)
+
+        # Быстрый отсев по старшему слову хеша (little-endian число)
+        top = words[7].byteswap()
+        candidates = np.nonzero(top <= (target >> 224))[0]
+
+        found = []
+        for i in candidates:
+            digest = struct.pack('>8I', *(int(w[i]) for w in words))
+            if int.from_bytes(digest, 'little') <= target:
+                found.append((start + int(i), digest))
+        return found
+
+
+ENGINES = {
+    'hashlib': HeaderHasher,
+    'numpy': NumpyHeaderHasher,
+}
+
+
+def available_engines():
+    """Движки, доступные в этом окружении"""
+    return [name for name in ENGINES
+            if name != 'numpy' or importlib.util.find_spec('numpy') is not None]
+
+
+def make_hasher(header, engine='hashlib'):
+    return ENGINES[engine](header)
+
+
+def verify_engine(engine, samples=64):
+    """Побитовая сверка движка с hashlib на известных и случайных заголовках"""
+    for header_hex, block_hash in KNOWN_HEADERS:
+        header = bytes.fromhex(header_hex)
+        nonce = struct.unpack('<I', header[76:80])[0]
+        hasher = make_hasher(header, engine)
+        if hasher.hash_nonce(nonce)[::-1].hex() != block_hash:
+            return False
+        # Перебор вокруг известного nonce должен найти именно его
+        target = int.from_bytes(bytes.fromhex(block_hash), 'big')
+        start = max(0, nonce - samples)
+        found = hasher.scan(start, nonce - start + samples, target)
+        if [n for n, _ in found] != [nonce]:
+            return False
+
+    header = demo_header()
+    hasher = make_hasher(header, engine)
+    found = hasher.scan(0, samples, (1 << 256) - 1)
+    expected = [double_sha256(header[:76] + _nonce_pack(n)) for n in range(samples)]
+    return [d for _, d in found] == expected
+
+
+def verify_merkle():
+    """MerkleBuilder против mainnet: генезис (coinbase, разрезанная под extranonce) и блок 100000"""
+    coinbase = bytes.fromhex(GENESIS_COINBASE)
+    # extranonce1 и extranonce2 - по 4 байта внутри scriptSig
+    builder = MerkleBuilder(coinbase[:42], coinbase[42:46], coinbase[50:], [], 4)
+    if builder.root(coinbase[46:50])[::-1].hex() != GENESIS_MERKLE_ROOT:
+        return False
+    if builder.coinbase(coinbase[46:50]) != coinbase:
+        return False
+
+    txids = [bytes.fromhex(txid)[::-1] for txid in BLOCK_100000_TXIDS]
+    builder = MerkleBuilder(b'', b'', b'', merkle_branch(txids[1:]), 0)
+    return builder.fold(txids[0])[::-1].hex() == BLOCK_100000_MERKLE_ROOT
+
+
+if __name__ == '__main__':
+    for name in available_engines():
+        print(f"{name}: {'OK' if verify_engine(name) else 'MISMATCH'}")
+    print(f"merkle: {'OK' if verify_merkle() else 'MISMATCH'}")
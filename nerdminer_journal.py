@@ -0,0 +1,126 @@
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+
+JOURNAL_FILE = os.path.join(os.path.expanduser('~'), '.nerdminer', 'stats.journal')
+
+MAGIC = b'NMJ1'
+# Заголовок файла: сигнатура и размер записи
+HEADER = struct.Struct('<4sI')
+# Запись: время, всего хешей, принято, отклонено, температура (40 байт)
+RECORD = struct.Struct('<dQQQf4x')
+# Каждая INDEX_STRIDE-я запись попадает в индекс времени в памяти
+INDEX_STRIDE = 256
+
+
+class StatsJournal:
+    """Журнал статистики: записи фиксированного размера раз в секунду, чтение через mmap"""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.map = None
+        self.mapped_size = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = self.open_file()
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - HEADER.size) // RECORD.size
+
+        # Оборванная при падении запись в конце отбрасывается
+        valid_size = HEADER.size + self.count * RECORD.size
+        if size != valid_size:
+            self.file.truncate(valid_size)
+
+        self.last_time = self.record(self.count - 1)[0] if self.count else 0.0
+        self.index = [self.record(i)[0] for i in range(0, self.count, INDEX_STRIDE)]
+
+    def open_file(self):
+        f = open(self.path, 'a+b')
+        f.seek(0)
+        header = f.read(HEADER.size)
+        if not header:
+            f.write(HEADER.pack(MAGIC, RECORD.size))
+            f.flush()
+            return f
+
+        magic, record_size = HEADER.unpack(header) if len(header) == HEADER.size else (b'', 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            # Чужой или старый формат - откладываем в сторону и начинаем заново
+            f.close()
+            print(f"⚠️ Stats journal format mismatch, moving {self.path} aside")
+            os.replace(self.path, self.path + '.bad')
+            return self.open_file()
+        return f
+
+    def append(self, t, hashes, accepted, rejected, temperature):
+        # Время в журнале не убывает, даже если системные часы перевели назад
+        t = max(t, self.last_time)
+        with self.lock:
+            self.file.write(RECORD.pack(t, hashes, accepted, rejected, temperature))
+            self.file.flush()
+            if self.count % INDEX_STRIDE == 0:
+                self.index.append(t)
+            self.count += 1
+            self.last_time = t
+
+    def view(self):
+        """Отображение файла в память, перестраивается когда файл вырос"""
+        size = HEADER.size + self.count * RECORD.size
+        if self.map is None or self.mapped_size < size:
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+            self.mapped_size = size
+        return self.map
+
+    def record(self, i):
+        """Запись i: (time, hashes, accepted, rejected, temperature)"""
+        with self.lock:
+            return RECORD.unpack_from(self.view(), HEADER.size + i * RECORD.size)
+
+    def last(self):
+        """Последняя запись - итоги без чтения всего журнала"""
+        return self.record(self.count - 1) if self.count else None
+
+    def range(self, start, end=float('inf')):
+        """Записи со временем в [start, end]: индекс -> блок -> бинарный поиск в mmap"""
+        with self.lock:
+            count = self.count
+            data = self.view()
+            block = max(bisect_left(self.index, start) - 1, 0)
+            lo = block * INDEX_STRIDE
+            hi = min(lo + INDEX_STRIDE, count)
+            first = bisect_left(_JournalTimes(data, lo, hi), start) + lo
+
+            records = []
+            for i in range(first, count):
+                record = RECORD.unpack_from(data, HEADER.size + i * RECORD.size)
+                if record[0] > end:
+                    break
+                records.append(record)
+            return records
+
+    def close(self):
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.file.close()
+
+
+class _JournalTimes:
+    """Времена записей lo..hi как последовательность - для bisect"""
+
+    def __init__(self, data, lo, hi):
+        self.data = data
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __getitem__(self, k):
+        return struct.unpack_from('<d', self.data, HEADER.size + (self.lo + k) * RECORD.size)[0]
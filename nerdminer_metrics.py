@@ -0,0 +1,79 @@
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы корзин, секунды
+BATCH_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SUBMIT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCHEDULE_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами; один писатель - без блокировок"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def add(self, counts, total):
+        """Добавление корзин другой гистограммы (например, из процесса)"""
+        for i, count in enumerate(counts):
+            self.counts[i] += count
+        self.sum += total
+
+    def count(self):
+        return sum(self.counts)
+
+
+def merge_histograms(histograms, buckets):
+    merged = Histogram(buckets)
+    for histogram in histograms:
+        merged.add(histogram.counts, histogram.sum)
+    return merged
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def _value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    """Сборка текста в формате Prometheus exposition"""
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """samples: [(labels, value)] или одно значение"""
+        if not isinstance(samples, list):
+            samples = [(None, samples)]
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_value(value)}")
+
+    def histogram(self, name, help_text, histogram):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            self.lines.append(f'{name}_bucket{{le="{_value(bound)}"}} {cumulative}')
+        self.lines.append(f"{name}_sum {_value(histogram.sum)}")
+        self.lines.append(f"{name}_count {cumulative}")
+
+    def render(self):
+        return ('\n'.join(self.lines) + '\n').encode()
@@ -0,0 +1,172 @@
+import time
+
+# Отсчет старта - до остальных импортов, чтобы бюджет их включал
+STARTED = time.perf_counter()
+
+import argparse
+import sys
+import threading
+
+from nerdminer_hashing import available_engines
+from nerdminer_core import MinerCore
+from nerdminer_thermal import SYSFS_ROOT, TARGET_TEMP
+from nerdminer_metrics import MetricsWriter, CONTENT_TYPE
+
+# Headless-майнер: при старте только ядро хеширования. Пул (asyncio), сеть
+# (requests) и HTTP грузятся, только если включены флагами; Kivy - никогда.
+
+# Раз в сколько секунд печатать строку статистики
+STATS_INTERVAL = 10
+# Бюджет от старта скрипта до первого хеша, миллисекунды
+STARTUP_BUDGET_MS = 100
+
+
+def format_rate(rate):
+    for unit, scale in (('MH/s', 1e6), ('kH/s', 1e3)):
+        if rate >= scale:
+            return f"{rate / scale:.2f} {unit}"
+    return f"{rate:.0f} H/s"
+
+
+def format_time(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class HeadlessMiner(MinerCore):
+    """Майнинг без интерфейса: ядро MinerCore, сетевые данные по запросу"""
+
+    def __init__(self, backend='threads', workers=None, engine='hashlib', batch=None, duty=1.0,
+                 pool=None, user='android', password='x', min_difficulty=None,
+                 max_temp=TARGET_TEMP, sysfs_root=SYSFS_ROOT, network=False):
+        super().__init__(backend, workers, engine, batch, duty, pool, user, password,
+                         min_difficulty, max_temp, sysfs_root)
+        self.use_network = network
+        self.network = None
+        self.start_time = 0
+        self.temperature = None
+
+    def start(self):
+        self.start_time = time.time()
+        if self.use_network:
+            from nerdminer_network import NetworkDataProvider
+            self.network = NetworkDataProvider()
+        super().start()
+
+    def tick(self):
+        """Раз в секунду: хешрейт и термо-регулятор"""
+        self.counters.sample()
+        self.temperature = self.sensors.temperature()
+        self.apply_thermal(self.temperature)
+
+    def status_line(self):
+        parts = [format_time(time.time() - self.start_time),
+                 format_rate(self.counters.ewma),
+                 f"{self.counters.total():,} hashes",
+                 f"shares {self.accepted}/{self.rejected}",
+                 f"best {self.best_difficulty:.4g}",
+                 f"idle {max(self.worker_idle(), default=0) * 1000:.0f} ms"]
+        if self.temperature is not None:
+            throttle = '' if self.governor.capacity == self.governor.max_capacity else \
+                f" ({self.active_workers}x{self.active_duty:.2f})"
+            parts.append(f"{self.temperature:.0f}°C{throttle}")
+        if self.pools:
+            pool = self.pools.active
+            parts.append(f"pool {pool.name if pool else '-'}")
+        if self.network:
+            values = self.network.get()
+            parts.append(f"block {values['block_height']:,} ${values['btc_price']:,.0f}")
+        return ' | '.join(parts)
+
+    def render_metrics(self):
+        writer = MetricsWriter()
+        self.write_metrics(writer)
+        return writer.render()
+
+
+def serve_metrics(miner, port):
+    """/metrics для Prometheus; http.server грузится только с --metrics-port"""
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = miner.metrics
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    miner.metrics = miner.render_metrics()
+    server = http.server.ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NerdMiner headless miner")
+    parser.add_argument('--backend', choices=['threads', 'processes'], default='threads')
+    parser.add_argument('--workers', type=int, default=None,
+                        help="число воркеров (по умолчанию 2 потока или os.cpu_count() процессов)")
+    parser.add_argument('--engine', choices=['hashlib', 'numpy'], default='hashlib')
+    parser.add_argument('--batch', type=int, default=None, help="nonce за проход воркера")
+    parser.add_argument('--duty', type=float, default=1.0, help="доля времени работы воркера (0-1)")
+    parser.add_argument('--pool', default=None, help="пулы Stratum host:port[*вес] через запятую")
+    parser.add_argument('--user', default='android')
+    parser.add_argument('--password', default='x')
+    parser.add_argument('--min-diff', type=float, default=None)
+    parser.add_argument('--max-temp', type=float, default=TARGET_TEMP)
+    parser.add_argument('--sysfs', default=SYSFS_ROOT)
+    parser.add_argument('--interval', type=float, default=STATS_INTERVAL, help="период строки статистики, секунды")
+    parser.add_argument('--network', action='store_true', help="высота блока и цена BTC в строке статистики")
+    parser.add_argument('--metrics-port', type=int, default=None, help="отдавать /metrics на этом порту")
+    parser.add_argument('--startup-check', action='store_true',
+                        help="выйти после первого хеша, напечатав время старта")
+    args = parser.parse_args()
+
+    if args.engine not in available_engines():
+        print(f"⚠️ Engine '{args.engine}' unavailable, using hashlib")
+        args.engine = 'hashlib'
+
+    miner = HeadlessMiner(backend=args.backend, workers=args.workers, engine=args.engine,
+                          batch=args.batch, duty=args.duty, pool=args.pool, user=args.user,
+                          password=args.password, min_difficulty=args.min_diff,
+                          max_temp=args.max_temp, sysfs_root=args.sysfs, network=args.network)
+    miner.start()
+
+    if args.startup_check:
+        miner.first_hash.wait(10)
+        elapsed_ms = (time.perf_counter() - STARTED) * 1000
+        miner.stop()
+        print(f"⚡ First hash after {elapsed_ms:.1f} ms (budget {STARTUP_BUDGET_MS} ms)", flush=True)
+        sys.exit(0 if elapsed_ms <= STARTUP_BUDGET_MS else 1)
+
+    server = serve_metrics(miner, args.metrics_port) if args.metrics_port else None
+    print(f"⛏️ Mining: {args.backend} x{miner.active_workers}, engine {args.engine}, "
+          f"{args.pool or 'local share target'}", flush=True)
+    last_line = time.time()
+    try:
+        while True:
+            time.sleep(1)
+            miner.tick()
+            if server:
+                miner.metrics = miner.render_metrics()
+            if time.time() - last_line >= args.interval:
+                last_line = time.time()
+                print(miner.status_line(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        miner.stop()
+        print(f"\n👋 Stopped: {miner.counters.total():,} hashes, {miner.accepted} shares")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+PRICE_URL = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
+BLOCKCHAIN_URL = "https://blockchain.info"
+CACHE_FILE = os.path.join(os.path.expanduser('~'), '.nerdminer', 'network_cache.json')
+
+# Сколько секунд данные считаются свежими
+CACHE_TTL = 60
+# Пауза перед повтором, если сеть недоступна
+RETRY_INTERVAL = 15
+REQUEST_TIMEOUT = 5
+
+
+class NetworkDataProvider:
+    """Цена BTC, высота блока и сложность: параллельно, с кешем и теплым стартом с диска"""
+
+    def __init__(self, ttl=CACHE_TTL, cache_file=CACHE_FILE, price_url=PRICE_URL,
+                 blockchain_url=BLOCKCHAIN_URL, timeout=REQUEST_TIMEOUT, on_update=None):
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.price_url = price_url
+        self.blockchain_url = blockchain_url
+        self.timeout = timeout
+        self.on_update = on_update
+
+        # Одна сессия - соединения к API переиспользуются
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.last_attempt = 0.0
+
+        self.values = {'btc_price': 0, 'block_height': 0, 'difficulty': 0.0}
+        self.updated = 0.0
+        self.load_cache()
+
+    def get(self):
+        """Текущие значения сразу; устаревший кеш обновляется в фоне"""
+        if self.is_stale():
+            self.refresh_async()
+        return dict(self.values)
+
+    def is_stale(self):
+        return time.time() - self.updated > self.ttl
+
+    def refresh_async(self):
+        with self.lock:
+            if self.refreshing or time.time() - self.last_attempt < RETRY_INTERVAL:
+                return
+            self.refreshing = True
+            self.last_attempt = time.time()
+        self.executor.submit(self.refresh)
+
+    def refresh(self):
+        """Параллельный запрос всех источников, возвращает True при хоть одном успехе"""
+        try:
+            futures = {
+                'btc_price': self.executor.submit(self.fetch_price),
+                'block_height': self.executor.submit(self.fetch_block_height),
+                'difficulty': self.executor.submit(self.fetch_difficulty),
+            }
+            fresh = {}
+            for key, future in futures.items():
+                try:
+                    fresh[key] = future.result()
+                except Exception as e:
+                    print(f"Network data error ({key}): {e}")
+
+            if not fresh:
+                return False
+            self.values = dict(self.values, **fresh)
+            self.updated = time.time()
+            self.save_cache()
+            if self.on_update:
+                self.on_update(dict(self.values))
+            return True
+        finally:
+            self.refreshing = False
+
+    def fetch_price(self):
+        response = self.session.get(self.price_url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['bitcoin']['usd']
+
+    def fetch_block_height(self):
+        response = self.session.get(f"{self.blockchain_url}/q/getblockcount", timeout=self.timeout)
+        response.raise_for_status()
+        return int(response.text)
+
+    def fetch_difficulty(self):
+        response = self.session.get(f"{self.blockchain_url}/q/getdifficulty", timeout=self.timeout)
+        response.raise_for_status()
+        return float(response.text)
+
+    def load_cache(self):
+        """Последние удачные значения с диска (теплый старт без сети)"""
+        try:
+            with open(self.cache_file) as f:
+                cached = json.load(f)
+            self.values.update(cached['values'])
+            self.updated = float(cached['updated'])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                json.dump({'values': self.values, 'updated': self.updated}, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"Network cache error: {e}")
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import threading
+import time
+
+from nerdminer_stratum import StratumClient, CONNECT_TIMEOUT
+
+# Нет mining.notify дольше - пул считается зависшим
+JOB_TIMEOUT = 120
+# Нет ответа на запрос дольше - пул считается зависшим
+REPLY_TIMEOUT = 10
+# Как часто проверяются резервные пулы
+HEALTH_INTERVAL = 30
+# Упавший пул не выбирается это время
+FAILURE_BACKOFF = 60
+CHECK_INTERVAL = 0.5
+# Сглаживание задержек
+RTT_ALPHA = 0.3
+
+
+class PoolState:
+    """Адрес, вес и измеренные задержки одного пула"""
+
+    def __init__(self, host, port, weight=1.0):
+        self.host = host
+        self.port = port
+        self.weight = weight
+        self.name = f"{host}:{port}"
+        # Подключение + ответ на mining.subscribe и ответ на mining.submit, секунды
+        self.connect_time = None
+        self.submit_rtt = None
+        self.healthy = True
+        self.down_until = 0.0
+        self.failures = 0
+
+    def observe(self, attr, value):
+        before = getattr(self, attr)
+        setattr(self, attr, value if before is None else before + RTT_ALPHA * (value - before))
+
+    def score(self):
+        """Меньше - лучше: задержка, деленная на вес"""
+        latency = max(self.connect_time or 0.0, self.submit_rtt or 0.0)
+        return latency / self.weight
+
+    def status(self):
+        return {
+            'pool': self.name,
+            'weight': self.weight,
+            'healthy': self.healthy,
+            'connect_ms': round(self.connect_time * 1000, 1) if self.connect_time is not None else None,
+            'submit_rtt_ms': round(self.submit_rtt * 1000, 1) if self.submit_rtt is not None else None,
+            'failures': self.failures,
+        }
+
+
+def parse_pools(spec):
+    """'host:port[*weight],...' -> [PoolState] в порядке приоритета"""
+    pools = []
+    for item in spec.split(','):
+        address, _, weight = item.strip().partition('*')
+        host, port = address.rsplit(':', 1)
+        pools.append(PoolState(host, int(port), float(weight or 1)))
+    return pools
+
+
+async def probe(pool, timeout):
+    """Время подключения и ответа на mining.subscribe"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(pool.host, pool.port), timeout=timeout)
+    try:
+        writer.write(json.dumps({'id': 1, 'method': 'mining.subscribe',
+                                 'params': ['nerdminer/2.0']}).encode() + b'\n')
+        line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        if not json.loads(line).get('result'):
+            raise ValueError("subscribe failed")
+        return time.perf_counter() - start
+    finally:
+        writer.close()
+
+
+class PoolManager:
+    """Несколько пулов: выбор по задержке и весу, переключение при отказе активного
+
+    Пока идет переключение, планировщик держит последний шаблон и воркеры
+    продолжают его перебирать.
+    """
+
+    def __init__(self, pools, user, password='x', on_job=None, on_result=None,
+                 job_timeout=JOB_TIMEOUT, reply_timeout=REPLY_TIMEOUT,
+                 health_interval=HEALTH_INTERVAL, failure_backoff=FAILURE_BACKOFF):
+        self.pools = pools
+        self.user = user
+        self.password = password
+        self.on_job = on_job
+        self.on_result = on_result
+        self.job_timeout = job_timeout
+        self.reply_timeout = reply_timeout
+        self.health_interval = health_interval
+        self.failure_backoff = failure_backoff
+
+        self.running = False
+        self.active = None
+        self.client = None
+        # Номер подключения: им помечаются задания, чтобы не слать шары чужому пулу
+        self.session = 0
+        self.switched_at = 0.0
+        self.checking = False
+        self.failovers = []
+        self.stale = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.monitor, name='pools', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.client:
+            self.client.stop()
+
+    def monitor(self):
+        # Первый выбор - по результатам проверки всех пулов
+        self.check_health()
+        self.switch(self.select())
+        last_check = time.time()
+
+        while self.running:
+            time.sleep(CHECK_INTERVAL)
+            reason = self.failure_reason()
+            if reason:
+                self.failover(reason)
+            if time.time() - last_check >= self.health_interval and not self.checking:
+                last_check = time.time()
+                threading.Thread(target=self.check_health, daemon=True).start()
+
+    def check_health(self):
+        """Параллельная проверка всех пулов, кроме активного"""
+        self.checking = True
+        try:
+            pools = [pool for pool in self.pools if pool is not self.active]
+            results = asyncio.run(self.probe_all(pools))
+            for pool, result in zip(pools, results):
+                if isinstance(result, float):
+                    pool.observe('connect_time', result)
+                    pool.healthy = True
+                else:
+                    pool.healthy = False
+        finally:
+            self.checking = False
+
+    async def probe_all(self, pools):
+        timeout = min(CONNECT_TIMEOUT, self.reply_timeout)
+        return await asyncio.gather(*(probe(pool, timeout) for pool in pools),
+                                    return_exceptions=True)
+
+    def select(self, exclude=None):
+        """Лучший доступный пул; при равной задержке - раньше в списке"""
+        now = time.time()
+        candidates = [pool for pool in self.pools
+                      if pool is not exclude and pool.healthy and pool.down_until <= now]
+        if not candidates:
+            # Все недоступны - пробуем тот, чей штраф кончится раньше
+            candidates = [min((pool for pool in self.pools if pool is not exclude),
+                              key=lambda pool: pool.down_until, default=exclude)]
+        return min(candidates, key=lambda pool: (pool.score(), self.pools.index(pool)))
+
+    def switch(self, pool):
+        if self.client:
+            self.client.stop()
+        self.active = pool
+        self.session += 1
+        self.switched_at = time.time()
+        client = StratumClient(pool.host, pool.port, self.user, self.password,
+                               on_job=lambda template: self.handle_job(client, template),
+                               on_result=lambda *result: self.handle_result(client, *result))
+        self.client = client
+        client.start()
+
+    def failure_reason(self):
+        client = self.client
+        now = time.time()
+        if not client.connected:
+            # Клиент сам переподключается; не вышло за reply_timeout - пул недоступен
+            if now - max(client.disconnected_at, self.switched_at) > self.reply_timeout:
+                return 'disconnected'
+        elif client.oldest_pending() > self.reply_timeout:
+            return 'reply timeout'
+        if now - max(client.last_job, self.switched_at) > self.job_timeout:
+            return 'no jobs'
+        return None
+
+    def failover(self, reason):
+        failed = self.active
+        failed.failures += 1
+        failed.healthy = False
+        failed.down_until = time.time() + self.failure_backoff
+        event = {
+            'from': failed.name,
+            'reason': reason,
+            'time': time.time(),
+            # Последний признак жизни старого пула
+            'last_message': self.client.last_message or self.switched_at,
+        }
+        self.failovers.append(event)
+
+        pool = self.select(exclude=failed)
+        event['to'] = pool.name
+        print(f"⚠️ Pool {failed.name} failed ({reason}), switching to {pool.name}")
+        self.switch(pool)
+
+    def handle_job(self, client, template):
+        if client is not self.client:
+            return
+        if self.failovers and 'job_time' not in self.failovers[-1]:
+            # Первое задание после переключения: столько работа шла впустую
+            event = self.failovers[-1]
+            event['job_time'] = time.time()
+            event['lost_seconds'] = event['job_time'] - event['last_message']
+        if self.on_job:
+            self.on_job(dict(template, session=self.session))
+
+    def handle_result(self, client, accepted, error, digest, latency):
+        if client is self.client and latency:
+            self.active.observe('submit_rtt', latency)
+        if self.on_result:
+            self.on_result(accepted, error, digest, latency)
+
+    def submit(self, job, nonce, digest=None):
+        # Шара задания прежнего пула (новый ответит "Job not found") или шара,
+        # пока новый пул не подключен, - уже не нужна
+        if (not self.client or not self.client.connected or
+                job.get('session') != self.session):
+            self.stale += 1
+            return
+        self.client.submit(job, nonce, digest)
+
+    def status(self):
+        return {
+            'active': self.active.name if self.active else None,
+            'failovers': len(self.failovers),
+            'stale_shares': self.stale,
+            'pools': [pool.status() for pool in self.pools],
+        }
@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Период выборки стеков, секунды (~200 Гц)
+SAMPLE_INTERVAL = 0.005
+MAX_SECONDS = 60
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+def collapse(frame):
+    """Стек от корня к листу в одну строку через ';'"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Выборочный профилировщик всех потоков процесса; в простое ничего не делает"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+
+    def profile(self, seconds):
+        """Collapsed stacks для flamegraph.pl/speedscope; None если профиль уже идет"""
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            return self.sample(seconds)
+        finally:
+            self.lock.release()
+
+    def sample(self, seconds):
+        own = threading.get_ident()
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread = names.get(ident, str(ident)).replace(' ', '_')
+                stacks[thread + ';' + collapse(frame)] += 1
+            time.sleep(self.interval)
+
+        lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+        return ('\n'.join(lines) + '\n').encode()
@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import collections
+import json
+
+from nerdminer_stratum import StratumClient, stratum_message
+
+# Сколько последних заданий пула принимаются в mining.submit
+JOB_HISTORY = 8
+# Майнер, не читающий уведомления, отключается, а не копит память
+MAX_WRITE_BUFFER = 256 * 1024
+
+
+class StratumProxy:
+    """Одна сессия с пулом на всех майнеров
+
+    Каждый майнер получает extranonce1 пула + свой префикс extranonce2
+    (1-2 байта) и укороченный extranonce2, поэтому их пространства поиска
+    не пересекаются. mining.notify сериализуется один раз и рассылается всем,
+    mining.submit пересылается в пул с префиксом майнера.
+    """
+
+    def __init__(self, pool_host, pool_port, user, password='x', host='0.0.0.0', port=3334):
+        self.host = host
+        self.port = port
+        self.upstream = StratumClient(pool_host, pool_port, user, password,
+                                      on_job=self.on_upstream_job)
+        self.clients = {}
+        self.prefixes = set()
+        self.next_prefix = 0
+
+        self.extranonce1 = None
+        self.extranonce2_size = 0
+        self.prefix_size = 0
+        self.difficulty = None
+        self.jobs = collections.deque(maxlen=JOB_HISTORY)
+        self.notify_line = None
+
+        self.accepted = 0
+        self.rejected = 0
+        self.loop = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        # Сессия с пулом живет в том же цикле, что и майнеры
+        self.upstream.loop = self.loop
+        self.upstream.running = True
+        self.upstream_task = asyncio.ensure_future(self.upstream.run())
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                                 backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.upstream.running = False
+        if self.upstream.writer:
+            self.upstream.writer.close()
+        self.upstream_task.cancel()
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def on_upstream_job(self, template):
+        if (template['extranonce1'] != self.extranonce1 or
+                template['extranonce2_size'] != self.extranonce2_size):
+            # Новая сессия с пулом: выданные extranonce1 недействительны, майнеры переподключатся
+            self.extranonce1 = template['extranonce1']
+            self.extranonce2_size = template['extranonce2_size']
+            self.prefix_size = 2 if self.extranonce2_size >= 4 else 1
+            self.jobs.clear()
+            for writer in list(self.clients):
+                writer.close()
+
+        notify = template['notify']
+        self.jobs.append(notify[0])
+        data = b''
+        if self.upstream.difficulty != self.difficulty:
+            self.difficulty = self.upstream.difficulty
+            data += stratum_message(None, 'mining.set_difficulty', [self.difficulty])
+        self.notify_line = stratum_message(None, 'mining.notify', notify)
+        data += self.notify_line
+
+        # Одна сериализация на всех; медленный майнер не тормозит остальных
+        for writer, client in list(self.clients.items()):
+            if not client['authorized']:
+                continue
+            if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                writer.close()
+                continue
+            writer.write(data)
+
+    def allocate_prefix(self):
+        """Свободный префикс extranonce2 по кругу: недавно освобожденный выдается последним"""
+        space = 1 << (8 * self.prefix_size)
+        for _ in range(space):
+            prefix = self.next_prefix % space
+            self.next_prefix += 1
+            if prefix not in self.prefixes:
+                self.prefixes.add(prefix)
+                return prefix
+        return None
+
+    async def handle_client(self, reader, writer):
+        client = {'prefix': None, 'authorized': False}
+        self.clients[writer] = client
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.handle_request(writer, client, json.loads(line))
+                await writer.drain()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            self.prefixes.discard(client['prefix'])
+            writer.close()
+
+    def handle_request(self, writer, client, request):
+        method = request.get('method')
+        message_id = request.get('id')
+        params = request.get('params') or []
+
+        if method == 'mining.subscribe':
+            if self.extranonce1 is None or self.extranonce2_size < 2:
+                writer.write(stratum_message(message_id, error=[20, "Upstream not ready", None]))
+                return
+            if client['prefix'] is None:
+                client['prefix'] = self.allocate_prefix()
+            if client['prefix'] is None:
+                writer.write(stratum_message(message_id, error=[20, "Proxy full", None]))
+                return
+            prefix = client['prefix'].to_bytes(self.prefix_size, 'big')
+            subscriptions = [['mining.set_difficulty', '1'], ['mining.notify', '1']]
+            writer.write(stratum_message(message_id, result=[
+                subscriptions, (self.extranonce1 + prefix).hex(),
+                self.extranonce2_size - self.prefix_size]))
+        elif method == 'mining.authorize':
+            client['authorized'] = True
+            writer.write(stratum_message(message_id, result=True))
+            if self.difficulty is not None:
+                writer.write(stratum_message(None, 'mining.set_difficulty', [self.difficulty]))
+            if self.notify_line:
+                writer.write(self.notify_line)
+        elif method == 'mining.submit':
+            self.forward_submit(writer, client, message_id, params)
+        else:
+            writer.write(stratum_message(message_id, error=[20, "Unknown method", None]))
+
+    def forward_submit(self, writer, client, message_id, params):
+        try:
+            worker, job_id, extranonce2, ntime, nonce = params[:5]
+            size = len(bytes.fromhex(extranonce2))
+        except ValueError:
+            writer.write(stratum_message(message_id, error=[20, "Malformed share", None]))
+            return
+        if client['prefix'] is None or size != self.extranonce2_size - self.prefix_size:
+            writer.write(stratum_message(message_id, error=[20, "Invalid extranonce2 size", None]))
+            return
+        if job_id not in self.jobs:
+            # Устаревшее задание - пул все равно отклонит, не тратим его время
+            writer.write(stratum_message(message_id, error=[21, "Job not found", None]))
+            return
+        if not self.upstream.writer:
+            writer.write(stratum_message(message_id, error=[20, "Upstream not connected", None]))
+            return
+
+        def on_reply(result, error):
+            if result and not error:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+            if not writer.is_closing():
+                writer.write(stratum_message(message_id, result=result, error=error))
+
+        prefix = client['prefix'].to_bytes(self.prefix_size, 'big').hex()
+        self.upstream.send('mining.submit',
+                           [self.upstream.user, job_id, prefix + extranonce2, ntime, nonce],
+                           on_reply)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NerdMiner Stratum proxy")
+    parser.add_argument('--pool', required=True, help="пул Stratum host:port")
+    parser.add_argument('--user', required=True, help="имя воркера в пуле (общее для всех майнеров)")
+    parser.add_argument('--password', default='x')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=3334)
+    args = parser.parse_args()
+
+    async def serve():
+        host, port = args.pool.rsplit(':', 1)
+        proxy = StratumProxy(host, int(port), args.user, args.password, args.host, args.port)
+        await proxy.start()
+        print(f"🔀 Stratum proxy listening on {args.host}:{proxy.port} -> {args.pool}")
+        while True:
+            await asyncio.sleep(60)
+            print(f"Miners: {len(proxy.clients)} Accepted: {proxy.accepted} Rejected: {proxy.rejected}")
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
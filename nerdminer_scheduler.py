@@ -0,0 +1,218 @@
+import collections
+import os
+import random
+import threading
+import time
+
+from nerdminer_hashing import MAX_NONCE, DEMO_SHARE_TARGET, MerkleBuilder, notify_header, make_hasher
+from nerdminer_metrics import Histogram, SCHEDULE_BUCKETS
+
+NONCE_SPACE = MAX_NONCE + 1
+# Размер выдаваемого диапазона nonce: потоку - секунды работы, процессу - десятки секунд
+THREAD_CHUNK = 1 << 20
+PROCESS_CHUNK = 1 << 24
+# Сколько готовых заданий держать в очереди каждого воркера
+PREFETCH_DEPTH = 2
+# Пауза потока подготовки, когда все очереди полны
+PREFETCH_WAIT = 0.5
+
+
+def demo_template(target=DEMO_SHARE_TARGET):
+    """Шаблон без пула: случайные prevhash и coinbase в формате mining.notify"""
+    notify = [
+        f"demo{random.randint(0, 0xFFFFFF):06x}",
+        os.urandom(32).hex(),
+        os.urandom(42).hex(),
+        os.urandom(30).hex(),
+        [],
+        '20000000',
+        '1d00ffff',
+        f"{int(time.time()):08x}",
+    ]
+    return {'job_id': notify[0], 'notify': notify, 'extranonce1': os.urandom(4),
+            'extranonce2_size': 4, 'target': target}
+
+
+class WorkScheduler:
+    """Выдача непересекающихся диапазонов nonce всем воркерам (потокам и процессам)
+
+    Заголовок (extranonce2, ntime) делится на диапазоны по одному курсору под
+    блокировкой, поэтому два воркера никогда не получат один и тот же nonce.
+    Когда курсор дошел до конца 32-битного пространства, строится следующий
+    заголовок: новый extranonce2 и merkle root, а после перебора extranonce2 -
+    сдвиг ntime.
+    """
+
+    def __init__(self, chunk=THREAD_CHUNK, nonce_space=NONCE_SPACE):
+        self.chunk = chunk
+        self.nonce_space = nonce_space
+        self.lock = threading.Lock()
+        self.template = None
+        # Coinbase и ветка текущего шаблона: новый root на extranonce2 без пересборки
+        self.merkle = None
+        self.generation = 0
+        self.job = None
+        self.cursor = nonce_space
+        self.extranonce2 = 0
+        self.ntime_roll = 0
+
+        # Накладные расходы планировщика для /metrics
+        self.durations = Histogram(SCHEDULE_BUCKETS)
+        self.headers = 0
+        self.ntime_rolls = 0
+
+    def set_template(self, template):
+        """Новое задание пула: старые диапазоны больше не выдаются"""
+        with self.lock:
+            self.template = template
+            self.merkle = None
+            self.generation += 1
+            self.job = None
+            self.cursor = self.nonce_space
+            self.extranonce2 = 0
+            self.ntime_roll = 0
+
+    def next_work(self):
+        """Задание с диапазоном [nonce_start, nonce_end) или None без шаблона"""
+        start_time = time.perf_counter()
+        with self.lock:
+            if self.template is None:
+                return None
+            if self.cursor >= self.nonce_space:
+                self.job = self.roll()
+                self.cursor = 0
+            start = self.cursor
+            self.cursor = min(start + self.chunk, self.nonce_space)
+            work = dict(self.job, nonce_start=start, nonce_end=self.cursor,
+                        generation=self.generation)
+            self.durations.observe(time.perf_counter() - start_time)
+        return work
+
+    def roll(self):
+        """Следующий заголовок: extranonce2 + 1, а при переполнении - ntime + 1"""
+        template = self.template
+        notify = template['notify']
+        size = template['extranonce2_size']
+        if self.extranonce2 >> (8 * size):
+            self.extranonce2 = 0
+            self.ntime_roll += 1
+            self.ntime_rolls += 1
+
+        if self.merkle is None:
+            self.merkle = MerkleBuilder.from_notify(notify, template['extranonce1'], size)
+        extranonce2 = self.extranonce2.to_bytes(size, 'big')
+        self.extranonce2 += 1
+        ntime = f"{(int(notify[7], 16) + self.ntime_roll) & 0xFFFFFFFF:08x}"
+        self.headers += 1
+        return {
+            'job_id': template['job_id'],
+            'header': notify_header(notify, self.merkle.root(extranonce2), ntime),
+            'target': template['target'],
+            'extranonce2': extranonce2.hex(),
+            'ntime': ntime,
+            # Подключение PoolManager, давшее шаблон
+            'session': template.get('session')
+        }
+
+
+class JobPrefetcher:
+    """Фоновая подготовка заданий для потоков-воркеров
+
+    Поток подготовки заранее берет у WorkScheduler следующие диапазоны для
+    каждого воркера и строит для них хешер (midstate, а для numpy - и первые
+    раунды), складывая пары (задание, хешер) в ограниченную очередь воркера.
+    Смена задания у воркера - взять готовую пару из своей очереди; merkle root
+    и midstate нового задания пула считаются не на хеширующем потоке.
+
+    Новое задание пула публикуется в generation, только когда у каждого
+    воркера в очереди уже лежит его пара: до этого воркеры дорабатывают пачки
+    старого задания, а не ждут подготовки.
+    """
+
+    def __init__(self, scheduler, workers, engine='hashlib', depth=PREFETCH_DEPTH):
+        self.scheduler = scheduler
+        self.engine = engine
+        self.depth = depth
+        self.queues = [collections.deque() for _ in range(workers)]
+        self.condition = threading.Condition()
+        # Воркеры могут ждать в take() еще до start()
+        self.running = True
+        # Поколение задания, для которого у всех воркеров есть готовая пара
+        self.generation = None
+        # Один хешер на заголовок: воркеры одного заголовка делят его
+        self.header = None
+        self.hasher = None
+
+        # Простой воркера между заданиями: сумма секунд и число смен
+        self.idle = [0.0] * workers
+        self.switches = [0] * workers
+        # Начало текущего ожидания: переживает take(), вернувшие None по timeout
+        self.wait_since = [None] * workers
+
+    def start(self):
+        self.thread = threading.Thread(target=self.prefetch_worker, name='prefetch', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def refresh(self):
+        """Новое задание пула: выбросить подготовленное и сразу готовить заново"""
+        with self.condition:
+            self.drop_stale()
+            self.condition.notify_all()
+
+    def drop_stale(self):
+        generation = self.scheduler.generation
+        for queue in self.queues:
+            while queue and queue[0][0]['generation'] != generation:
+                queue.popleft()
+
+    def take(self, index, timeout=None):
+        """Следующая пара (задание, хешер) воркера; None, если за timeout ничего нет"""
+        if self.wait_since[index] is None:
+            self.wait_since[index] = time.perf_counter()
+        queue = self.queues[index]
+        with self.condition:
+            self.drop_stale()
+            if not queue:
+                self.condition.notify_all()
+                if not self.condition.wait_for(lambda: queue or not self.running, timeout) or not queue:
+                    return None
+            item = queue.popleft()
+            # Освободилось место - поток подготовки дольет очередь
+            self.condition.notify_all()
+        # Ожидание самого первого задания (подключение к пулу) - не простой между заданиями
+        if self.switches[index]:
+            self.idle[index] += time.perf_counter() - self.wait_since[index]
+        self.wait_since[index] = None
+        self.switches[index] += 1
+        return item
+
+    def prefetch_worker(self):
+        while self.running:
+            with self.condition:
+                self.drop_stale()
+                hungry = [i for i, queue in enumerate(self.queues) if len(queue) < self.depth]
+                if not hungry:
+                    self.condition.wait(PREFETCH_WAIT)
+                    continue
+            # Самый пустой воркер первым; расчеты без блокировки очередей
+            index = min(hungry, key=lambda i: len(self.queues[i]))
+            work = self.scheduler.next_work()
+            if work is None:
+                with self.condition:
+                    self.condition.wait(PREFETCH_WAIT)
+                continue
+            if work['header'] != self.header:
+                self.hasher = make_hasher(work['header'], self.engine)
+                self.header = work['header']
+            with self.condition:
+                # Пока готовили, могло прийти новое задание пула
+                if work['generation'] == self.scheduler.generation:
+                    self.queues[index].append((work, self.hasher))
+                    if all(queue for queue in self.queues):
+                        self.generation = work['generation']
+                    self.condition.notify_all()
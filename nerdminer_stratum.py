@@ -0,0 +1,384 @@
+import argparse
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+
+# header_from_notify живет в ядре хеширования, чтобы майнинг без пула не грузил asyncio
+from nerdminer_hashing import double_sha256, difficulty_to_target, header_from_notify
+
+RECONNECT_DELAY = 5
+CONNECT_TIMEOUT = 10
+
+
+def stratum_message(message_id, method=None, params=None, result=None, error=None):
+    """Строка JSON-RPC Stratum: запрос/уведомление или ответ"""
+    if method:
+        message = {'id': message_id, 'method': method, 'params': params}
+    else:
+        message = {'id': message_id, 'result': result, 'error': error}
+    return json.dumps(message).encode() + b'\n'
+
+
+class StratumClient:
+    """Клиент Stratum v1: подписка, авторизация, задания и отправка шар"""
+
+    def __init__(self, host, port, user, password='x', on_job=None, on_result=None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.on_job = on_job
+        self.on_result = on_result
+
+        self.running = False
+        self.connected = False
+        # Для наблюдения за здоровьем пула (PoolManager)
+        self.connect_time = None
+        self.disconnected_at = time.time()
+        self.last_message = 0.0
+        self.last_job = 0.0
+        self.loop = None
+        self.writer = None
+        self.message_id = 0
+        self.pending = {}
+
+        self.extranonce1 = b''
+        self.extranonce2_size = 4
+        self.difficulty = 1
+        self.notify = None
+        self.lock = threading.Lock()
+
+        self.accepted = 0
+        self.rejected = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run_loop, name='stratum', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.loop and self.writer:
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+    def run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.run())
+        self.loop.close()
+
+    async def run(self):
+        while self.running:
+            try:
+                await self.session()
+            except (OSError, EOFError, ValueError, asyncio.TimeoutError) as e:
+                if self.running:
+                    print(f"Stratum error: {e}")
+            self.connected = False
+            self.disconnected_at = time.time()
+            self.writer = None
+            self.pending.clear()
+            if self.running:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def session(self):
+        connect_start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=CONNECT_TIMEOUT)
+        self.connect_time = time.perf_counter() - connect_start
+        self.writer = writer
+        self.connected = True
+        print(f"⛏️ Connected to pool {self.host}:{self.port}")
+
+        try:
+            self.send('mining.subscribe', ['nerdminer/2.0'], self.on_subscribe)
+            self.send('mining.authorize', [self.user, self.password], self.on_authorize)
+            await writer.drain()
+
+            while self.running:
+                line = await reader.readline()
+                if not line:
+                    raise EOFError("pool closed connection")
+                self.last_message = time.time()
+                self.handle_message(json.loads(line))
+        finally:
+            writer.close()
+
+    def send(self, method, params, handler=None):
+        self.message_id += 1
+        self.pending[self.message_id] = (time.time(), handler)
+        line = json.dumps({'id': self.message_id, 'method': method, 'params': params})
+        self.writer.write(line.encode() + b'\n')
+
+    def oldest_pending(self):
+        """Сколько секунд ждет ответа самый старый запрос (0 - ничего не ждем)"""
+        sent = [sent_time for sent_time, handler in list(self.pending.values())]
+        return time.time() - min(sent) if sent else 0.0
+
+    def handle_message(self, message):
+        method = message.get('method')
+        if method == 'mining.notify':
+            self.on_notify(message['params'])
+        elif method == 'mining.set_difficulty':
+            self.difficulty = float(message['params'][0])
+        elif message.get('id') in self.pending:
+            sent_time, handler = self.pending.pop(message['id'])
+            if handler:
+                handler(message.get('result'), message.get('error'))
+
+    def on_subscribe(self, result, error):
+        if error or not result:
+            raise ValueError(f"subscribe failed: {error}")
+        self.extranonce1 = bytes.fromhex(result[1])
+        self.extranonce2_size = int(result[2])
+
+    def on_authorize(self, result, error):
+        if not result:
+            print(f"Stratum authorize failed: {error}")
+
+    def on_notify(self, params):
+        with self.lock:
+            self.notify = params
+        self.last_job = time.time()
+        if self.on_job:
+            template = self.make_template()
+            if template:
+                self.on_job(template)
+
+    def make_template(self):
+        """Шаблон работы по последнему mining.notify; заголовки строит WorkScheduler"""
+        with self.lock:
+            if self.notify is None:
+                return None
+            return {
+                'job_id': self.notify[0],
+                'notify': self.notify,
+                'extranonce1': self.extranonce1,
+                'extranonce2_size': self.extranonce2_size,
+                'target': difficulty_to_target(self.difficulty)
+            }
+
+    def submit(self, job, nonce, digest=None):
+        """Отправка шары (потокобезопасно, не ждет ответа пула)"""
+        params = [self.user, job['job_id'], job['extranonce2'], job['ntime'], f"{nonce:08x}"]
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.send_submit, params, digest)
+
+    def send_submit(self, params, digest):
+        if not self.writer:
+            self.on_submit_result(False, 'not connected', digest, 0.0)
+            return
+        sent_time = time.time()
+        self.send('mining.submit', params,
+                  lambda result, error: self.on_submit_result(
+                      bool(result) and not error, error, digest, time.time() - sent_time))
+
+    def on_submit_result(self, accepted, error, digest, latency):
+        if accepted:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        if self.on_result:
+            self.on_result(accepted, error, digest, latency)
+
+
+class MockPool:
+    """Локальный Stratum-пул для тестов: выдает задания и проверяет шары"""
+
+    extranonce2_size = 4
+
+    def __init__(self, host='127.0.0.1', port=3333, difficulty=0.0001, job_interval=30, latency=0.0):
+        self.host = host
+        self.port = port
+        self.difficulty = difficulty
+        self.job_interval = job_interval
+        # Искусственная задержка ответа и имитация отказа (None, 'down', 'silent')
+        self.latency = latency
+        self.outage = None
+        self.jobs = {}
+        self.job_order = []
+        self.clients = {}
+        self.next_extranonce1 = 1
+        self.job_counter = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.loop = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.new_job()
+        self.job_task = asyncio.ensure_future(self.job_loop())
+
+    async def close(self):
+        self.job_task.cancel()
+        for writer in list(self.clients):
+            writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def set_outage(self, mode):
+        """Отказ из другого потока: down - порт закрыт, silent - молчит, None - снова работает"""
+        asyncio.run_coroutine_threadsafe(self.apply_outage(mode), self.loop).result()
+
+    async def apply_outage(self, mode):
+        if mode == 'down' and self.outage != 'down':
+            for writer in list(self.clients):
+                writer.close()
+            self.server.close()
+            await self.server.wait_closed()
+        elif mode != 'down' and self.outage == 'down':
+            self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.outage = mode
+
+    def start_in_thread(self):
+        """Запуск пула в фоновом потоке, возвращает номер порта"""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self.port
+
+    async def job_loop(self):
+        while True:
+            await asyncio.sleep(self.job_interval)
+            self.new_job()
+
+    def new_job(self):
+        self.job_counter += 1
+        job_id = f"{self.job_counter:x}"
+        notify = [
+            job_id,
+            os.urandom(32).hex(),
+            os.urandom(42).hex(),
+            os.urandom(30).hex(),
+            [os.urandom(32).hex() for _ in range(2)],
+            '20000000',
+            '1d00ffff',
+            f"{int(time.time()):08x}",
+            True
+        ]
+        self.jobs[job_id] = {'notify': notify, 'shares': set()}
+        self.job_order.append(job_id)
+        if len(self.job_order) > 8:
+            self.jobs.pop(self.job_order.pop(0), None)
+
+        if self.outage:
+            return
+        for writer, client in self.clients.items():
+            if client['authorized']:
+                self.send(writer, None, 'mining.notify', notify)
+
+    def send(self, writer, message_id, method=None, params=None, result=None, error=None):
+        writer.write(stratum_message(message_id, method, params, result, error))
+
+    async def handle_client(self, reader, writer):
+        extranonce1 = struct.pack('>I', self.next_extranonce1)
+        self.next_extranonce1 += 1
+        client = {'extranonce1': extranonce1, 'authorized': False}
+        self.clients[writer] = client
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if self.outage:
+                    continue
+                request = json.loads(line)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                self.handle_request(writer, client, request)
+                await writer.drain()
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def handle_request(self, writer, client, request):
+        method = request.get('method')
+        message_id = request.get('id')
+        params = request.get('params') or []
+
+        if method == 'mining.subscribe':
+            subscriptions = [['mining.set_difficulty', '1'], ['mining.notify', '1']]
+            self.send(writer, message_id, result=[
+                subscriptions, client['extranonce1'].hex(), self.extranonce2_size])
+        elif method == 'mining.authorize':
+            client['authorized'] = True
+            self.send(writer, message_id, result=True)
+            self.send(writer, None, 'mining.set_difficulty', [self.difficulty])
+            self.send(writer, None, 'mining.notify', self.jobs[self.job_order[-1]]['notify'])
+        elif method == 'mining.submit':
+            error = self.validate_share(client, params)
+            if error:
+                self.rejected += 1
+            else:
+                self.accepted += 1
+            self.send(writer, message_id, result=error is None, error=error)
+        else:
+            self.send(writer, message_id, result=None, error=[20, "Unknown method", None])
+
+    def validate_share(self, client, params):
+        """Проверка шары, возвращает None или ошибку Stratum"""
+        try:
+            worker, job_id, extranonce2, ntime, nonce = params[:5]
+            extranonce2 = bytes.fromhex(extranonce2)
+            nonce = int(nonce, 16)
+        except ValueError:
+            return [20, "Malformed share", None]
+
+        job = self.jobs.get(job_id)
+        if job is None:
+            return [21, "Job not found", None]
+        if len(extranonce2) != self.extranonce2_size:
+            return [20, "Invalid extranonce2 size", None]
+
+        key = (client['extranonce1'], extranonce2, ntime, nonce)
+        if key in job['shares']:
+            return [22, "Duplicate share", None]
+
+        header = header_from_notify(job['notify'], client['extranonce1'], extranonce2, ntime)
+        digest = double_sha256(header[:76] + struct.pack('<I', nonce))
+        if int.from_bytes(digest, 'little') > difficulty_to_target(self.difficulty):
+            return [23, "Low difficulty share", None]
+
+        job['shares'].add(key)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NerdMiner mock Stratum pool")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3333)
+    parser.add_argument('--difficulty', type=float, default=0.0001)
+    parser.add_argument('--job-interval', type=float, default=30)
+    parser.add_argument('--latency', type=float, default=0.0, help="задержка ответов, секунды")
+    args = parser.parse_args()
+
+    async def serve():
+        pool = MockPool(args.host, args.port, args.difficulty, args.job_interval, args.latency)
+        await pool.start()
+        print(f"🧪 Mock pool listening on {args.host}:{pool.port}")
+        while True:
+            await asyncio.sleep(60)
+            print(f"Accepted: {pool.accepted} Rejected: {pool.rejected}")
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
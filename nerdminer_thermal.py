@@ -0,0 +1,148 @@
+import glob
+import math
+import os
+import time
+
+SYSFS_ROOT = '/sys'
+# Показания кешируются: чтение sysfs на телефоне будит датчики
+READ_TTL = 2.0
+# Правдоподобные градусы; вне диапазона - отключенный или сломанный датчик
+MIN_VALID = -30
+MAX_VALID = 150
+
+# Целевая температура и полоса, в которой мощность не меняется
+TARGET_TEMP = 45.0
+HYSTERESIS = 3.0
+# Не чаще одного шага: температура отстает от нагрузки на секунды
+STEP_INTERVAL = 10.0
+# Снижение на градус превышения и шаг роста (доля максимума)
+DECREASE_PER_DEGREE = 0.05
+MAX_DECREASE = 0.5
+INCREASE_STEP = 0.05
+MIN_DUTY = 0.1
+
+
+def read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class ThermalSensors:
+    """Температуры thermal_zone* и батареи из sysfs; файлы открыты один раз, чтение через pread"""
+
+    def __init__(self, root=SYSFS_ROOT, ttl=READ_TTL):
+        self.root = root
+        self.ttl = ttl
+        # Имя датчика -> (дескриптор, делитель до градусов, можно ли уже градусы)
+        self.files = {}
+        self.values = {}
+        self.read_at = None
+        self.discover()
+
+    def discover(self):
+        zones = sorted(glob.glob(os.path.join(self.root, 'class', 'thermal', 'thermal_zone*')))
+        for zone in zones:
+            # Температура зоны в милиградусах (некоторые ядра отдают уже градусы)
+            self.add(read_text(os.path.join(zone, 'type')) or os.path.basename(zone),
+                     os.path.join(zone, 'temp'), 1000, degrees_fallback=True)
+        supplies = sorted(glob.glob(os.path.join(self.root, 'class', 'power_supply', '*')))
+        for supply in supplies:
+            # Батарея - всегда в десятых долях градуса: 120 - это 12.0 °C
+            if read_text(os.path.join(supply, 'type')) == 'Battery':
+                self.add('battery', os.path.join(supply, 'temp'), 10)
+
+    def add(self, name, path, scale, degrees_fallback=False):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        if name in self.files:
+            name = f"{name}-{len(self.files)}"
+        self.files[name] = (fd, scale, degrees_fallback)
+
+    def read(self):
+        """Градусы по датчикам; чаще раза в ttl возвращается кеш"""
+        now = time.monotonic()
+        if self.read_at is not None and now - self.read_at < self.ttl:
+            return self.values
+        values = {}
+        for name, (fd, scale, degrees_fallback) in self.files.items():
+            try:
+                raw = int(os.pread(fd, 32, 0))
+            except (OSError, ValueError):
+                continue
+            if degrees_fallback and abs(raw) <= MAX_VALID:
+                value = float(raw)
+            else:
+                value = raw / scale
+            if MIN_VALID <= value <= MAX_VALID:
+                values[name] = value
+        self.values = values
+        self.read_at = now
+        return values
+
+    def temperature(self):
+        """Самый горячий датчик или None, если датчиков нет"""
+        values = self.read()
+        return max(values.values()) if values else None
+
+    def close(self):
+        for fd, scale, degrees_fallback in self.files.values():
+            os.close(fd)
+        self.files = {}
+
+
+class ThermalGovernor:
+    """Мощность майнинга (воркеры x duty) под целевую температуру
+
+    Выше цели мощность снижается пропорционально превышению, ниже полосы
+    гистерезиса - растет маленьким шагом; внутри полосы не меняется, а шаги
+    не чаще interval, поэтому нет качелей вкл/выкл.
+    """
+
+    def __init__(self, workers, duty=1.0, target=TARGET_TEMP, hysteresis=HYSTERESIS,
+                 interval=STEP_INTERVAL, min_duty=MIN_DUTY):
+        self.workers = workers
+        self.target = target
+        self.hysteresis = hysteresis
+        self.interval = interval
+        self.max_capacity = workers * duty
+        self.min_capacity = min(min_duty, self.max_capacity)
+        self.capacity = self.max_capacity
+        self.changed_at = None
+
+    @property
+    def active_workers(self):
+        return min(self.workers, max(1, math.ceil(self.capacity - 1e-9)))
+
+    @property
+    def duty(self):
+        return self.capacity / self.active_workers
+
+    def update(self, temperature, now=None):
+        """Шаг по новой температуре; True, если мощность изменилась"""
+        if temperature is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if self.changed_at is not None and now - self.changed_at < self.interval:
+            return False
+        if temperature > self.target:
+            cut = min(MAX_DECREASE, DECREASE_PER_DEGREE * max(1.0, temperature - self.target))
+            capacity = self.capacity * (1 - cut)
+        elif temperature < self.target - self.hysteresis:
+            capacity = self.capacity + INCREASE_STEP * self.max_capacity
+        else:
+            return False
+        capacity = min(self.max_capacity, max(self.min_capacity, capacity))
+        if capacity == self.capacity:
+            return False
+        self.capacity = capacity
+        self.changed_at = now
+        return True
+
+    def status(self):
+        return {'target': self.target, 'active_workers': self.active_workers,
+                'duty': round(self.duty, 3)}
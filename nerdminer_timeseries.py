@@ -0,0 +1,107 @@
+from array import array
+from bisect import bisect_left
+
+# Разрешение -> (шаг в секундах, число точек в кольце)
+RESOLUTIONS = {
+    '1s': (1, 3600),          # час посекундно
+    '1m': (60, 7 * 1440),     # неделя поминутно
+    '1h': (3600, 90 * 24),    # 90 дней почасово
+}
+
+
+class RingSeries:
+    """Кольцевой буфер фиксированного размера: время, min, max, mean в массивах array"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.mins = array('d', bytes(8 * capacity))
+        self.maxs = array('d', bytes(8 * capacity))
+        self.means = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, low, high, mean):
+        if self.count < self.capacity:
+            i = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            # Полный буфер - перезаписываем самую старую точку
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[i] = t
+        self.mins[i] = low
+        self.maxs[i] = high
+        self.means[i] = mean
+
+    def point(self, k):
+        """k-я точка от самой старой: (time, min, max, mean)"""
+        i = (self.start + k) % self.capacity
+        return self.times[i], self.mins[i], self.maxs[i], self.means[i]
+
+    def last(self, n):
+        n = min(n, self.count)
+        return [self.point(k) for k in range(self.count - n, self.count)]
+
+    def since(self, t):
+        """Точки со временем >= t; время в кольце растет, поэтому бинарный поиск"""
+        time_at = _RingTimes(self)
+        first = bisect_left(time_at, t)
+        return [self.point(k) for k in range(first, self.count)]
+
+
+class _RingTimes:
+    """Последовательность времен кольца по порядку - для bisect"""
+
+    def __init__(self, series):
+        self.series = series
+
+    def __len__(self):
+        return self.series.count
+
+    def __getitem__(self, k):
+        return self.series.times[(self.series.start + k) % self.series.capacity]
+
+
+class TimeSeriesStore:
+    """Хешрейт на разрешениях 1 с, 1 мин и 1 ч: фиксированная память, O(1) на точку"""
+
+    def __init__(self, resolutions=RESOLUTIONS):
+        self.levels = {}
+        for name, (step, capacity) in resolutions.items():
+            # Накопитель текущего интервала: [начало, min, max, сумма, число точек]
+            self.levels[name] = (step, RingSeries(capacity), [None, 0.0, 0.0, 0.0, 0])
+
+    def add(self, t, value):
+        value = float(value)
+        for step, series, acc in self.levels.values():
+            bucket = t - t % step
+            if acc[0] is not None and bucket != acc[0]:
+                # Интервал закончился - сворачиваем в точку
+                series.append(acc[0], acc[1], acc[2], acc[3] / acc[4])
+                acc[0] = None
+            if acc[0] is None:
+                acc[:] = [bucket, value, value, 0.0, 0]
+            acc[1] = min(acc[1], value)
+            acc[2] = max(acc[2], value)
+            acc[3] += value
+            acc[4] += 1
+
+    def query(self, resolution, since=0):
+        """Точки [time, min, max, mean] начиная с since, включая незакрытый интервал"""
+        step, series, acc = self.levels[resolution]
+        points = [list(p) for p in series.since(since)]
+        if acc[0] is not None and acc[0] >= since:
+            points.append([acc[0], acc[1], acc[2], acc[3] / acc[4]])
+        return points
+
+    def last(self, resolution, n):
+        step, series, acc = self.levels[resolution]
+        points = series.last(n)
+        if acc[0] is not None:
+            points = points[1:] if len(points) >= n else points
+            points.append((acc[0], acc[1], acc[2], acc[3] / acc[4]))
+        return points
@@ -0,0 +1,162 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import threading
+import time
+
+from nerdminer_hashing import make_hasher, demo_header
+from nerdminer_workers import duty_sleep
+
+TUNING_FILE = os.path.join(os.path.expanduser('~'), '.nerdminer', 'tuning.json')
+
+# Длительность одного замера, секунды
+TRIAL_SECONDS = 1.0
+BATCHES = (256, 1024, 4096)
+DEFAULT_BATCH = 1024
+# Воркер добавляется, только если хешрейт вырос хотя бы на столько
+MIN_GAIN = 0.05
+# Превышение бюджета CPU в пределах погрешности замера
+BUDGET_TOLERANCE = 0.05
+MIN_DUTY = 0.1
+
+
+def trial_loop(engine, batch, duty, deadline):
+    """Цикл воркера майнера на заглушке; возвращает число хешей"""
+    hasher = make_hasher(demo_header(), engine)
+    batch = max(batch, hasher.min_batch)
+    nonce = count = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        hasher.scan(nonce, batch, 0)
+        nonce += batch
+        count += batch
+        duty_sleep(time.perf_counter() - start, duty)
+    return count
+
+
+def thread_trial(engine, workers, batch, duty, seconds):
+    """H/s и доля CPU устройства для потоков в этом процессе"""
+    counts = [0] * workers
+    deadline = time.perf_counter() + seconds
+
+    def run(i):
+        counts[i] = trial_loop(engine, batch, duty, deadline)
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(counts) / elapsed, (time.process_time() - cpu_start) / elapsed
+
+
+def process_trial_worker(engine, batch, duty, seconds, results):
+    results.put(trial_loop(engine, batch, duty, time.perf_counter() + seconds))
+
+
+def _children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def process_trial(engine, workers, batch, duty, seconds):
+    """То же для процессов: CPU дочерних процессов учитывается после join"""
+    results = multiprocessing.Queue()
+    cpu_start, start = _children_cpu(), time.perf_counter()
+    processes = [multiprocessing.Process(target=process_trial_worker,
+                                         args=(engine, batch, duty, seconds, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    count = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    return count / elapsed, (_children_cpu() - cpu_start) / elapsed
+
+
+def tune(backend='threads', engine='hashlib', cpu_budget=1.0, trial=TRIAL_SECONDS, log=print):
+    """Перебор числа воркеров, пачки и duty; лучший хешрейт в пределах cpu_budget
+
+    cpu_budget - доля всего устройства (1.0 - все ядра).
+    """
+    cores = os.cpu_count() or 1
+    measure = process_trial if backend == 'processes' else thread_trial
+    results = []
+
+    def run(workers, batch, duty):
+        hps, cpu = measure(engine, workers, batch, duty, trial)
+        result = {'workers': workers, 'batch': batch, 'duty': duty,
+                  'hps': round(hps), 'cpu': round(cpu / cores, 3)}
+        results.append(result)
+        log(f"🔧 {workers} workers, batch {batch}, duty {duty:.2f}: "
+            f"{result['hps']:,} H/s, CPU {result['cpu']:.0%}")
+        return result
+
+    # 1. Воркеры на полной скорости, пока добавление дает прирост
+    best = None
+    for workers in range(1, cores + 1):
+        result = run(workers, DEFAULT_BATCH, 1.0)
+        if best and result['hps'] < best['hps'] * (1 + MIN_GAIN):
+            break
+        best = result
+
+    # 2. Размер пачки для выбранного числа воркеров
+    for batch in BATCHES:
+        if batch != DEFAULT_BATCH:
+            result = run(best['workers'], batch, 1.0)
+            if result['hps'] > best['hps']:
+                best = result
+
+    # 3. Бюджет CPU: урезаем duty тем конфигурациям, что в него не влезли
+    limit = cpu_budget * (1 + BUDGET_TOLERANCE)
+    for full in [r for r in results if r['cpu'] > limit and r['batch'] == best['batch']]:
+        duty = round(max(MIN_DUTY, cpu_budget / full['cpu']), 2)
+        run(full['workers'], full['batch'], duty)
+
+    feasible = [r for r in results if r['cpu'] <= limit]
+    choice = (max(feasible, key=lambda r: r['hps']) if feasible
+              else min(results, key=lambda r: r['cpu']))
+    return dict(choice, backend=backend, engine=engine, cpu_budget=cpu_budget,
+                tuned_at=int(time.time()))
+
+
+def device_id():
+    """Отпечаток устройства: файл, скопированный на другой телефон, не применится"""
+    return f"{platform.node()}/{platform.machine()}/{os.cpu_count()}"
+
+
+def tuning_key(backend, engine, cpu_budget):
+    return f"{backend}/{engine}/{cpu_budget:g}"
+
+
+def load_tuning(backend, engine, cpu_budget, path=TUNING_FILE):
+    """Сохраненный результат для этого устройства или None"""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        return saved[device_id()][tuning_key(backend, engine, cpu_budget)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_tuning(config, path=TUNING_FILE):
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    key = tuning_key(config['backend'], config['engine'], config['cpu_budget'])
+    saved.setdefault(device_id(), {})[key] = config
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(saved, f, indent=2)
+        os.replace(tmp_file, path)
+    except OSError as e:
+        print(f"Tuning save error: {e}")
@@ -1,149 +1,240 @@
+import argparse
 import http.server
-import socketserver
+import sys
 import threading
 import time
-import hashlib
-import random
+import urllib.parse
 import json
-import requests
-from datetime import datetime
+from nerdminer_hashing import available_engines
+from nerdminer_core import MinerCore
+from nerdminer_thermal import SYSFS_ROOT, TARGET_TEMP
+from nerdminer_tuning import tune, load_tuning, save_tuning
+from nerdminer_network import NetworkDataProvider
+from nerdminer_timeseries import TimeSeriesStore, RESOLUTIONS
+from nerdminer_journal import StatsJournal, JOURNAL_FILE
+from nerdminer_profile import StackSampler, MAX_SECONDS as MAX_PROFILE_SECONDS
+from nerdminer_metrics import MetricsWriter, CONTENT_TYPE
 
-class NerdMinerV2:
+# Точек в спарклайне (последние секунды)
+SPARKLINE_POINTS = 30
+# Пустое событие в /api/stream, чтобы прокси не закрывали соединение
+STREAM_KEEPALIVE = 15
+# Предел одновременных соединений и таймаут простоя keep-alive, секунды
+MAX_CONNECTIONS = 128
+REQUEST_TIMEOUT = 10
+
+class StatsBroadcaster:
+    """Рассылка снимков статистики всем подписчикам /api/stream"""
+    
     def __init__(self):
-        self.mining = False
+        self.condition = threading.Condition()
+        self.version = 0
+        self.payload = b''
+    
+    def publish(self, payload):
+        # Снимок сериализуется один раз на всех подписчиков
+        with self.condition:
+            if payload == self.payload:
+                return
+            self.payload = payload
+            self.version += 1
+            self.condition.notify_all()
+    
+    def wait(self, version, timeout):
+        """Ждет снимок новее version, возвращает (version, payload)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version, self.payload
+
+class NerdMinerV2(MinerCore):
+    """Ядро майнинга (MinerCore) со статистикой, журналом и веб-интерфейсом"""
+    
+    def __init__(self, backend='threads', workers=None, engine='hashlib',
+                 pool=None, user='android', password='x', journal_path=JOURNAL_FILE,
+                 min_difficulty=None, cpu_budget=1.0, max_temp=TARGET_TEMP, sysfs_root=SYSFS_ROOT):
+        super().__init__(backend, workers, engine, pool=pool, user=user, password=password,
+                         min_difficulty=min_difficulty, max_temp=max_temp, sysfs_root=sysfs_root)
+        
+        # Пачка и доля времени работы; подбираются автотюнером под бюджет CPU
+        self.cpu_budget = cpu_budget
+        self.explicit_workers = workers is not None
+        self.tune_lock = threading.Lock()
+        tuned = load_tuning(backend, engine, cpu_budget)
+        if tuned:
+            self.apply_tuning(tuned)
+        
         self.stats = {
             'hash_rate': 0,
             'total_hashes': 0,
             'accepted_shares': 0,
             'rejected_shares': 0,
             'uptime': 0,
-            'temperature': 45,
+            'temperature': None,
             'block_height': 0,
             'difficulty': "0",
             'network_hashrate': "0 EH/s",
             'btc_price': 0,
-            'pool': "nerdminer.com:3333",
-            'worker': "android",
+            'pool': pool or "nerdminer.com:3333",
+            'worker': user,
             'efficiency': "100%"
         }
         self.start_time = 0
-        self.hash_history = []
-        self.last_shares = []
+        # История хешрейта: 1 с / 1 мин / 1 ч, память фиксирована
+        self.hash_history = TimeSeriesStore()
+        self.sparkline = []
+        self.stats['workers'] = []
+        # Простой воркеров между заданиями, секунды с начала майнинга
+        self.stats['worker_idle'] = []
+        self.broadcaster = StatsBroadcaster()
+        self.profiler = StackSampler()
+        
+        # Итоги переживают перезапуск: восстанавливаем из хвоста журнала
+        self.journal = None
+        if journal_path:
+            try:
+                self.journal = StatsJournal(journal_path)
+                self.restore_from_journal()
+            except OSError as e:
+                print(f"Stats journal error: {e}")
+        
+        self.metrics = self.render_metrics()
         
-        # Загружаем реальные данные
-        self.update_network_data()
+        # Сетевые данные: сразу из кеша на диске, свежие придут в фоне
+        self.network = NetworkDataProvider(on_update=self.apply_network_data)
+        self.apply_network_data(self.network.get())
         
+    def apply_network_data(self, values):
+        """Перенос данных сети в статистику"""
+        self.stats['btc_price'] = values['btc_price']
+        self.stats['block_height'] = values['block_height']
+        diff = values['difficulty']
+        if diff:
+            self.stats['difficulty'] = f"{diff/1e12:.2f} T"
+            self.stats['network_hashrate'] = f"{diff * 2**32 / 600 / 1e18:.2f} EH/s"
+    
+    def restore_from_journal(self):
+        """Итоги из последней записи и история за последний час"""
+        last = self.journal.last()
+        if last is None:
+            return
+        t, hashes, accepted, rejected, temperature = last
+        self.stats['total_hashes'] = self.hashes_base = hashes
+        self.stats['accepted_shares'] = self.accepted = accepted
+        self.stats['rejected_shares'] = self.rejected = rejected
+        self.stats['temperature'] = round(temperature, 1) if temperature else None
+        
+        previous = None
+        for record in self.journal.range(t - 3600):
+            if previous and record[0] > previous[0]:
+                rate = (record[1] - previous[1]) / (record[0] - previous[0])
+                self.hash_history.add(record[0], max(rate, 0))
+            previous = record
+        print(f"📒 Restored {hashes:,} hashes, {accepted} shares from journal")
+    
     def update_network_data(self):
-        """Получение реальных данных из сети"""
-        try:
-            # BTC цена
-            response = requests.get("https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd", timeout=5)
-            if response.status_code == 200:
-                self.stats['btc_price'] = response.json()['bitcoin']['usd']
-            
-            # Данные блокчейна
-            response = requests.get("https://blockchain.info/q/getblockcount", timeout=5)
-            if response.status_code == 200:
-                self.stats['block_height'] = int(response.text)
-            
-            response = requests.get("https://blockchain.info/q/getdifficulty", timeout=5)
-            if response.status_code == 200:
-                diff = float(response.text)
-                self.stats['difficulty'] = f"{diff/1e12:.2f} T"
-                self.stats['network_hashrate'] = f"{diff * 2**32 / 600 / 1e18:.2f} EH/s"
-                
-        except Exception as e:
-            print(f"Network data error: {e}")
+        """Не блокирует: устаревшие данные обновляются в фоне"""
+        self.apply_network_data(self.network.get())
     
     def start_mining(self):
         if self.mining:
             return
             
-        self.mining = True
         self.start_time = time.time()
+        # Итоги хешей и шар накопительные (и восстанавливаются из журнала)
         self.stats.update({
             'hash_rate': 0,
-            'total_hashes': 0,
-            'accepted_shares': 0,
-            'rejected_shares': 0,
-            'uptime': 0
+            'uptime': 0,
+            'workers': [],
+            'worker_idle': []
         })
-        self.hash_history = []
+        self.hashes_base = self.stats['total_hashes']
         self.last_shares = []
+        self.start()
         
-        # Запуск майнинга
-        for i in range(2):
-            thread = threading.Thread(target=self.mine_worker, daemon=True)
-            thread.start()
-            
         # Обновление статистики
-        stats_thread = threading.Thread(target=self.stats_worker, daemon=True)
+        stats_thread = threading.Thread(target=self.stats_worker, name='stats', daemon=True)
         stats_thread.start()
         
         # Обновление сетевых данных
-        network_thread = threading.Thread(target=self.network_worker, daemon=True)
+        network_thread = threading.Thread(target=self.network_worker, name='network', daemon=True)
         network_thread.start()
         
         print("🚀 NerdMiner v2 started!")
     
     def stop_mining(self):
-        self.mining = False
+        self.stop()
+        self.publish_stats()
         print("⏹️ NerdMiner stopped!")
     
-    def mine_worker(self):
-        worker_id = threading.get_ident()
-        local_hashes = 0
-        last_stat_time = time.time()
-        
-        while self.mining:
-            # Имитация реального майнинга
-            data = f"nerdminer{worker_id}{time.time()}{random.randint(0, 1000000000)}"
-            hash_result = hashlib.sha256(data.encode()).hexdigest()
-            
-            self.stats['total_hashes'] += 1
-            local_hashes += 1
-            
-            # Найден шар (каждые ~1000 хешей)
-            if random.random() < 0.001:
-                self.stats['accepted_shares'] += 1
-                self.last_shares.append({
-                    'time': datetime.now().strftime("%H:%M:%S"),
-                    'diff': random.randint(1000, 10000)
-                })
-                if len(self.last_shares) > 5:
-                    self.last_shares.pop(0)
-            
-            # Обновление хешрейта каждую секунду
-            current_time = time.time()
-            if current_time - last_stat_time >= 1.0:
-                self.stats['hash_rate'] = local_hashes
-                local_hashes = 0
-                last_stat_time = current_time
-            
-            time.sleep(0.001)
+    def apply_tuning(self, config):
+        if not self.explicit_workers:
+            self.workers = config['workers']
+        self.batch = config['batch']
+        self.duty = config['duty']
+        print(f"🔧 Tuning: {self.workers} workers, batch {self.batch}, duty {self.duty:.2f}")
+    
+    def autotune(self):
+        """Замер конфигураций (майнинг на это время останавливается) и сохранение выбора"""
+        if not self.tune_lock.acquire(blocking=False):
+            return False
+        try:
+            was_mining = self.mining
+            self.stop_mining()
+            # Старые воркеры доделывают пачку и не мешают замеру
+            time.sleep(0.5)
+            config = tune(self.backend, self.engine, self.cpu_budget)
+            save_tuning(config)
+            self.apply_tuning(config)
+            if was_mining:
+                self.start_mining()
+            return True
+        finally:
+            self.tune_lock.release()
     
     def stats_worker(self):
-        while self.mining:
+        while True:
+            # После остановки - еще один проход, чтобы итоги попали в журнал
+            running = self.mining
             self.stats['uptime'] = time.time() - self.start_time
-            self.stats['temperature'] = random.randint(40, 60)
+            
+            # Сумма по слотам воркеров и сглаженный хешрейт
+            self.stats['hash_rate'] = int(self.counters.sample())
+            self.stats['total_hashes'] = self.total_hashes()
+            self.stats['accepted_shares'] = self.accepted
+            self.stats['rejected_shares'] = self.rejected
+            self.stats['workers'] = self.counters.rates
+            self.stats['worker_idle'] = self.worker_idle()
+            temperature = self.sensors.temperature()
+            self.stats['temperature'] = round(temperature, 1) if temperature is not None else None
+            if running:
+                self.apply_thermal(temperature)
             
             # Добавление в историю для графика
-            self.hash_history.append(self.stats['hash_rate'])
-            if len(self.hash_history) > 30:
-                self.hash_history.pop(0)
+            self.hash_history.add(time.time(), self.stats['hash_rate'])
+            self.sparkline = self.generate_sparkline_data()
             
+            # Запись в журнал раз в секунду
+            if self.journal:
+                self.journal.append(time.time(), self.stats['total_hashes'],
+                                    self.stats['accepted_shares'], self.stats['rejected_shares'],
+                                    self.stats['temperature'] or 0.0)
+            
+            self.publish_stats()
+            self.metrics = self.render_metrics()
+            if not running:
+                break
             time.sleep(1)
     
     def network_worker(self):
         while self.mining:
             self.update_network_data()
-            time.sleep(60)  # Обновление каждую минуту
+            time.sleep(5)  # Дешево: запрос в сеть только когда кеш устарел
     
     def get_efficiency(self):
-        total = self.stats['accepted_shares'] + self.stats['rejected_shares']
+        total = self.accepted + self.rejected
         if total == 0:
             return "100%"
-        eff = (self.stats['accepted_shares'] / total) * 100
+        eff = (self.accepted / total) * 100
         return f"{eff:.1f}%"
     
     def format_time(self, seconds):
@@ -152,31 +243,138 @@ class NerdMinerV2:
         seconds = int(seconds % 60)
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
     
+    def get_snapshot(self):
+        """Снимок статистики для /api/stats и /api/stream"""
+        return {
+            'mining': self.mining,
+            'hash_rate': self.stats['hash_rate'],
+            'total_hashes': self.stats['total_hashes'],
+            'accepted_shares': self.accepted,
+            'rejected_shares': self.rejected,
+            'uptime': self.format_time(self.stats['uptime']),
+            'efficiency': self.get_efficiency(),
+            'block_height': self.stats['block_height'],
+            'difficulty': self.stats['difficulty'],
+            'btc_price': self.stats['btc_price'],
+            'workers': self.stats['workers'],
+            'worker_idle_ms': [round(s * 1000, 3) for s in self.stats['worker_idle']],
+            'config': {'workers': len(self.stats['workers']) or self.workers,
+                       'batch': self.batch, 'duty': self.duty},
+            'thermal': dict(self.governor.status() if self.governor else {},
+                            temperature=self.stats['temperature'], sensors=self.sensors.values),
+            'sparkline': self.sparkline,
+            'last_shares': self.last_shares,
+            'pools': self.pools.status() if self.pools else None
+        }
+    
+    def render_metrics(self):
+        """Текст для /metrics; строится раз в тик, запросы отдают готовый снимок"""
+        writer = MetricsWriter()
+        writer.metric('nerdminer_mining', 'gauge', "1 while mining", int(self.mining))
+        writer.metric('nerdminer_uptime_seconds', 'gauge', "Seconds since mining started",
+                      float(self.stats['uptime']))
+        self.write_metrics(writer)
+        return writer.render()
+    
+    def publish_stats(self):
+        self.broadcaster.publish(json.dumps(self.get_snapshot()).encode())
+    
     def generate_sparkline_data(self):
         """Генерация данных для спарклайна"""
-        if not self.hash_history:
+        # Считается раз в тик в stats_worker, а не на каждый запрос
+        values = [mean for t, low, high, mean in self.hash_history.last('1s', SPARKLINE_POINTS)]
+        if not values:
             return []
         
-        max_val = max(self.hash_history)
+        max_val = max(values)
         if max_val == 0:
-            return [0] * len(self.hash_history)
+            return [0] * len(values)
         
-        return [int((h / max_val) * 100) for h in self.hash_history]
+        return [int((h / max_val) * 100) for h in values]
+    
+    def get_history(self, resolution, since=0):
+        """История хешрейта для /api/history"""
+        return {
+            'resolution': resolution,
+            'step': RESOLUTIONS[resolution][0],
+            'fields': ['time', 'min', 'max', 'mean'],
+            'points': self.hash_history.query(resolution, since)
+        }
+
+class NerdMinerServer(http.server.ThreadingHTTPServer):
+    """Поток на соединение, но не больше MAX_CONNECTIONS одновременно"""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    # Очередь listen() по умолчанию 5 - пачка подключений в нее не влезает
+    request_queue_size = MAX_CONNECTIONS
+    
+    def __init__(self, address, handler, max_connections=MAX_CONNECTIONS):
+        super().__init__(address, handler)
+        self.slots = threading.BoundedSemaphore(max_connections)
+    
+    def process_request(self, request, client_address):
+        # Сверх лимита сразу отвечаем 503, а не копим потоки
+        if not self.slots.acquire(blocking=False):
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\n"
+                                b"Content-Length: 0\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        super().process_request(request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.slots.release()
+    
+    def handle_error(self, request, client_address):
+        # Клиент закрыл соединение или не уложился в таймаут - это не ошибка сервера
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            return
+        super().handle_error(request, client_address)
 
 class NerdMinerHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep-alive: несколько запросов по одному соединению
+    protocol_version = 'HTTP/1.1'
+    # Таймаут сокета: простаивающее соединение освобождает поток
+    timeout = REQUEST_TIMEOUT
+    # Заголовки и тело уходят разными write - без Nagle нет задержки 40 мс
+    disable_nagle_algorithm = True
+    
     def __init__(self, *args, **kwargs):
         self.miner = kwargs.pop('miner')
         super().__init__(*args, **kwargs)
     
     def do_GET(self):
-        if self.path == '/':
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        
+        if url.path == '/':
             self.serve_main_page()
-        elif self.path == '/api/stats':
+        elif url.path == '/api/stats':
             self.serve_stats()
-        elif self.path == '/api/start':
+        elif url.path == '/api/stream':
+            self.serve_stream()
+        elif url.path == '/metrics':
+            self.send_body(self.miner.metrics, CONTENT_TYPE)
+        elif url.path == '/api/history':
+            self.serve_history(query)
+        elif url.path == '/api/tune':
+            if self.miner.tune_lock.locked():
+                self.send_error(409, "tuning already running")
+            else:
+                threading.Thread(target=self.miner.autotune, name='tune', daemon=True).start()
+                self.send_json({'status': 'tuning'})
+        elif url.path == '/api/profile':
+            self.serve_profile(query)
+        elif url.path == '/api/start':
             self.miner.start_mining()
             self.send_json({'status': 'started'})
-        elif self.path == '/api/stop':
+        elif url.path == '/api/stop':
             self.miner.stop_mining()
             self.send_json({'status': 'stopped'})
         else:
@@ -291,58 +489,60 @@ class NerdMinerHandler(http.server.SimpleHTTPRequestHandler):
                 function updateStats() {
                     fetch('/api/stats')
                         .then(r => r.json())
-                        .then(data => {
-                            // Update status
-                            document.getElementById('status').textContent = 
-                                data.mining ? 'MINING 🟢' : 'STOPPED 🔴';
-                            
-                            // Update stats
-                            document.getElementById('stats').innerHTML = `
-                                <div class="stat-row">
-                                    <span>Hash Rate:</span>
-                                    <span>${data.hash_rate.toLocaleString()} H/s</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Total Hashes:</span>
-                                    <span>${data.total_hashes.toLocaleString()}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Shares:</span>
-                                    <span>A: ${data.accepted_shares} R: ${data.rejected_shares}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Efficiency:</span>
-                                    <span>${data.efficiency}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Uptime:</span>
-                                    <span>${data.uptime}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Block:</span>
-                                    <span>${data.block_height.toLocaleString()}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>Difficulty:</span>
-                                    <span>${data.difficulty}</span>
-                                </div>
-                                <div class="stat-row">
-                                    <span>BTC Price:</span>
-                                    <span>$${data.btc_price.toLocaleString()}</span>
-                                </div>
-                            `;
-                            
-                            // Update sparkline
-                            updateSparkline(data.sparkline);
-                            
-                            // Update shares
-                            if (data.last_shares.length > 0) {
-                                document.getElementById('shares').innerHTML = 
-                                    data.last_shares.map(share => 
-                                        `<div class="share">${share.time} - Diff: ${share.diff}</div>`
-                                    ).join('');
-                            }
-                        });
+                        .then(renderStats);
+                }
+                
+                function renderStats(data) {
+                    // Update status
+                    document.getElementById('status').textContent = 
+                        data.mining ? 'MINING 🟢' : 'STOPPED 🔴';
+                    
+                    // Update stats
+                    document.getElementById('stats').innerHTML = `
+                        <div class="stat-row">
+                            <span>Hash Rate:</span>
+                            <span>${data.hash_rate.toLocaleString()} H/s</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Total Hashes:</span>
+                            <span>${data.total_hashes.toLocaleString()}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Shares:</span>
+                            <span>A: ${data.accepted_shares} R: ${data.rejected_shares}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Efficiency:</span>
+                            <span>${data.efficiency}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Uptime:</span>
+                            <span>${data.uptime}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Block:</span>
+                            <span>${data.block_height.toLocaleString()}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>Difficulty:</span>
+                            <span>${data.difficulty}</span>
+                        </div>
+                        <div class="stat-row">
+                            <span>BTC Price:</span>
+                            <span>$${data.btc_price.toLocaleString()}</span>
+                        </div>
+                    `;
+                    
+                    // Update sparkline
+                    updateSparkline(data.sparkline);
+                    
+                    // Update shares
+                    if (data.last_shares.length > 0) {
+                        document.getElementById('shares').innerHTML = 
+                            data.last_shares.map(share => 
+                                `<div class="share">${share.time} - Diff: ${share.diff}</div>`
+                            ).join('');
+                    }
                 }
                 
                 function updateSparkline(data) {
@@ -361,61 +561,151 @@ class NerdMinerHandler(http.server.SimpleHTTPRequestHandler):
                 }
                 
                 function startMining() {
-                    fetch('/api/start').then(() => {
-                        if (!updateInterval) {
-                            updateInterval = setInterval(updateStats, 2000);
-                        }
-                    });
+                    fetch('/api/start');
                 }
                 
                 function stopMining() {
                     fetch('/api/stop');
                 }
                 
-                // Start updating stats
-                updateInterval = setInterval(updateStats, 2000);
-                updateStats();
+                // Live stats: server pushes snapshots, polling only as a fallback
+                if (window.EventSource) {
+                    const stream = new EventSource('/api/stream');
+                    stream.onmessage = event => renderStats(JSON.parse(event.data));
+                } else {
+                    updateInterval = setInterval(updateStats, 2000);
+                    updateStats();
+                }
             </script>
         </body>
         </html>
         """
         
+        body = html.encode()
         self.send_response(200)
         self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(html.encode())
+        self.wfile.write(body)
     
     def serve_stats(self):
-        stats = {
-            'mining': self.miner.mining,
-            'hash_rate': self.miner.stats['hash_rate'],
-            'total_hashes': self.miner.stats['total_hashes'],
-            'accepted_shares': self.miner.stats['accepted_shares'],
-            'rejected_shares': self.miner.stats['rejected_shares'],
-            'uptime': self.miner.format_time(self.miner.stats['uptime']),
-            'efficiency': self.miner.get_efficiency(),
-            'block_height': self.miner.stats['block_height'],
-            'difficulty': self.miner.stats['difficulty'],
-            'btc_price': self.miner.stats['btc_price'],
-            'sparkline': self.miner.generate_sparkline_data(),
-            'last_shares': self.miner.last_shares
-        }
-        self.send_json(stats)
+        self.send_json(self.miner.get_snapshot())
+    
+    def serve_history(self, query):
+        resolution = query.get('resolution', ['1s'])[0]
+        if resolution not in RESOLUTIONS:
+            self.send_error(400, f"resolution must be one of {', '.join(RESOLUTIONS)}")
+            return
+        try:
+            since = float(query.get('since', ['0'])[0])
+        except ValueError:
+            self.send_error(400, "since must be a unix timestamp")
+            return
+        self.send_json(self.miner.get_history(resolution, since))
+    
+    def serve_profile(self, query):
+        """Выборка стеков всех потоков за seconds секунд, формат collapsed"""
+        try:
+            seconds = float(query.get('seconds', ['5'])[0])
+        except ValueError:
+            seconds = 0
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            self.send_error(400, f"seconds must be in (0, {MAX_PROFILE_SECONDS}]")
+            return
+        stacks = self.miner.profiler.profile(seconds)
+        if stacks is None:
+            self.send_error(409, "profile already running")
+            return
+        self.send_body(stacks, 'text/plain; charset=utf-8')
+    
+    def serve_stream(self):
+        """Server-Sent Events: снимок статистики при каждом изменении"""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        
+        broadcaster = self.miner.broadcaster
+        version = None
+        payload = json.dumps(self.miner.get_snapshot()).encode()
+        try:
+            while True:
+                if payload:
+                    self.wfile.write(b'data: ' + payload + b'\n\n')
+                else:
+                    self.wfile.write(b': keepalive\n\n')
+                self.wfile.flush()
+                
+                new_version, new_payload = broadcaster.wait(version, STREAM_KEEPALIVE)
+                payload = new_payload if new_version != version else None
+                version = new_version
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            pass
     
     def send_json(self, data):
+        self.send_body(json.dumps(data).encode(), 'application/json')
+    
+    def send_body(self, body, content_type):
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+
+def make_server(miner, port, host=''):
+    handler = lambda *args: NerdMinerHandler(*args, miner=miner)
+    return NerdMinerServer((host, port), handler)
 
 def main():
-    miner = NerdMinerV2()
+    parser = argparse.ArgumentParser(description="NerdMiner v2 - Android")
+    parser.add_argument('--backend', choices=['threads', 'processes'], default='threads',
+                        help="threads - потоки, processes - пул процессов на все ядра")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="число воркеров (по умолчанию 2 потока или os.cpu_count() процессов)")
+    parser.add_argument('--engine', choices=['hashlib', 'numpy'], default='hashlib',
+                        help="hashlib - midstate через hashlib, numpy - векторный перебор")
+    parser.add_argument('--pool', default=None,
+                        help="пулы Stratum host:port[*вес] через запятую, по приоритету "
+                             "(без них - локальная цель шар)")
+    parser.add_argument('--user', default='android', help="имя воркера в пуле")
+    parser.add_argument('--password', default='x')
+    parser.add_argument('--min-diff', type=float, default=None,
+                        help="локальная минимальная сложность шары (выше сложности пула)")
+    parser.add_argument('--cpu-budget', type=float, default=1.0,
+                        help="доля CPU устройства для майнинга (0-1), под нее подбирается конфигурация")
+    parser.add_argument('--tune', action='store_true',
+                        help="подобрать воркеры, пачку и duty заново (иначе - сохраненный выбор)")
+    parser.add_argument('--max-temp', type=float, default=TARGET_TEMP,
+                        help="целевая температура, °C: выше нее уменьшаются воркеры и duty")
+    parser.add_argument('--sysfs', default=SYSFS_ROOT,
+                        help="корень sysfs с thermal_zone* и power_supply (для проверки - поддельное дерево)")
+    parser.add_argument('--fleet', default=None,
+                        help="режим агрегатора: узлы host:port через запятую или файл со списком")
+    args = parser.parse_args()
+    
+    if args.fleet:
+        # Этот телефон не майнит, а собирает статистику остальных на :8090
+        from nerdminer_fleet import run_fleet, parse_nodes
+        run_fleet(parse_nodes(args.fleet))
+        return
+    
+    if args.engine not in available_engines():
+        print(f"⚠️ Engine '{args.engine}' unavailable, using hashlib")
+        args.engine = 'hashlib'
+    
+    miner = NerdMinerV2(backend=args.backend, workers=args.workers, engine=args.engine,
+                        pool=args.pool, user=args.user, password=args.password,
+                        min_difficulty=args.min_diff, cpu_budget=args.cpu_budget,
+                        max_temp=args.max_temp, sysfs_root=args.sysfs)
+    if args.tune:
+        miner.autotune()
     
     # Запуск веб-сервера
     port = 8080
-    handler = lambda *args: NerdMinerHandler(*args, miner=miner)
     
-    with socketserver.TCPServer(("", port), handler) as httpd:
+    with make_server(miner, port) as httpd:
         print(f"🌐 NerdMiner v2 Web Interface: http://localhost:{port}")
         print("📱 Open this URL in your phone's browser")
         print("🎛️ Controls: START/STOP mining from web interface")
@@ -0,0 +1,260 @@
+import collections
+import math
+import os
+import queue
+import signal
+import threading
+import time
+
+from nerdminer_hashing import make_hasher
+from nerdminer_metrics import Histogram, BATCH_BUCKETS
+
+# Процессы не делят GIL, поэтому пачка крупнее, чем у потоков
+PROCESS_BATCH = 4096
+# Как часто процесс отправляет счетчик хешей
+REPORT_INTERVAL = 0.5
+# Как часто поток сбрасывает локальный счетчик в свой слот
+FLUSH_INTERVAL = 0.25
+# Постоянная времени сглаживания хешрейта, секунды
+EWMA_TAU = 10.0
+# Как часто отключенный термо-регулятором воркер проверяет, не пора ли продолжать
+PARK_INTERVAL = 0.5
+# Диапазонов в очереди процесса: следующий уже ждет, пока перебирается текущий
+PROCESS_PREFETCH = 2
+
+
+class HashCounters:
+    """Счетчики хешей по слотам: каждый воркер пишет только в свой слот"""
+
+    def __init__(self, slots, tau=EWMA_TAU):
+        self.slots = [0] * slots
+        self.tau = tau
+        self.last_slots = [0] * slots
+        self.last_time = time.time()
+        self.rates = [0] * slots
+        self.ewma = 0.0
+
+    def add(self, index, count):
+        # Единственный писатель слота - его воркер, гонки нет
+        self.slots[index] += count
+
+    def total(self):
+        return sum(self.slots)
+
+    def sample(self):
+        """Хешрейт по воркерам за прошедший интервал и сглаженный общий"""
+        current_time = time.time()
+        dt = current_time - self.last_time
+        if dt <= 0:
+            return self.ewma
+        slots = list(self.slots)
+        self.rates = [int((now - before) / dt) for now, before in zip(slots, self.last_slots)]
+        rate = sum(self.rates)
+        if self.ewma == 0:
+            self.ewma = float(rate)
+        else:
+            alpha = 1 - math.exp(-dt / self.tau)
+            self.ewma += alpha * (rate - self.ewma)
+        self.last_slots = slots
+        self.last_time = current_time
+        return self.ewma
+
+
+def duty_sleep(busy, duty):
+    """Пауза после пачки, чтобы работа занимала долю duty времени"""
+    if duty < 1.0:
+        time.sleep(busy * (1.0 - duty) / duty)
+
+
+def process_worker(index, job_queue, result_queue, stop_event, batch, engine, duty, active):
+    """Процесс майнинга: перебирает выданный диапазон nonce и шлет отчеты пачками
+
+    duty и active - общие multiprocessing.Value: доля времени работы и число
+    работающих процессов (процессы с index >= active простаивают).
+    """
+    # Ctrl+C получает вся группа процессов; останавливает родитель через stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    job = None
+    hasher = None
+    nonce = end = 0
+    local_hashes = 0
+    durations = Histogram(BATCH_BUCKETS)
+    last_report = time.time()
+    # Следующие диапазоны того же задания и простой между заданиями
+    pending = collections.deque()
+    idle = 0.0
+    idle_since = None
+
+    while not stop_event.is_set():
+        # Новое задание (без блокировки, если уже есть что майнить)
+        try:
+            new_job = job_queue.get(block=nonce >= end and not pending, timeout=0.2)
+        except queue.Empty:
+            new_job = None
+        if new_job is not None:
+            if job is not None and new_job['generation'] == job['generation']:
+                # Запасной диапазон того же задания - возьмем, когда кончится текущий
+                pending.append(new_job)
+                new_job = None
+            else:
+                # Новое задание пула - переключаемся сразу, запас устарел
+                pending.clear()
+                if job is not None and idle_since is None:
+                    idle_since = time.perf_counter()
+        if new_job is None and nonce >= end and pending:
+            new_job = pending.popleft()
+        if new_job is not None:
+            # Следующий диапазон того же заголовка - midstate тот же
+            if job is None or new_job['header'] != job['header']:
+                hasher = make_hasher(new_job['header'], engine)
+                batch = max(batch, hasher.min_batch)
+            job = new_job
+            nonce, end = job['nonce_start'], job['nonce_end']
+            if idle_since is not None:
+                idle += time.perf_counter() - idle_since
+                idle_since = None
+        if nonce >= end:
+            continue
+        if index >= active.value:
+            # Очередь все равно разбираем, чтобы после паузы взять свежее задание
+            time.sleep(PARK_INTERVAL)
+            continue
+
+        count = min(batch, end - nonce)
+        batch_start = time.perf_counter()
+        found = hasher.scan(nonce, count, job['target'])
+        busy = time.perf_counter() - batch_start
+        durations.observe(busy)
+        for share_nonce, digest in found:
+            result_queue.put(('share', index, job, share_nonce, digest))
+        nonce += count
+        local_hashes += count
+
+        if nonce >= end:
+            # Диапазон исчерпан - берем запасной и просим еще один
+            result_queue.put(('exhausted', index, job['job_id']))
+            idle_since = time.perf_counter()
+
+        duty_sleep(busy, duty.value)
+
+        current_time = time.time()
+        if current_time - last_report >= REPORT_INTERVAL or nonce >= end:
+            # Вместе со счетчиком - корзины длительности пачек
+            result_queue.put(('hashes', index, local_hashes, (durations.counts, durations.sum), idle))
+            local_hashes = 0
+            idle = 0.0
+            durations = Histogram(BATCH_BUCKETS)
+            last_report = current_time
+
+    if local_hashes:
+        result_queue.put(('hashes', index, local_hashes, (durations.counts, durations.sum), idle))
+
+
+class ProcessMiner:
+    """Майнинг в пуле процессов: диапазоны nonce выдает WorkScheduler через set_job"""
+
+    def __init__(self, scheduler, workers=None, batch=PROCESS_BATCH, engine='hashlib',
+                 duty=1.0, on_hashes=None, on_share=None, on_exhausted=None,
+                 prefetch=PROCESS_PREFETCH):
+        self.scheduler = scheduler
+        self.workers = workers or os.cpu_count() or 1
+        self.batch = batch
+        self.engine = engine
+        self.duty = duty
+        self.on_hashes = on_hashes
+        self.on_share = on_share
+        self.on_exhausted = on_exhausted
+        self.prefetch = prefetch
+        self.processes = []
+        # Простой процессов между заданиями, секунды
+        self.idle = [0.0] * self.workers
+        self.job_queues = []
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+
+        # multiprocessing нужен только этому бэкенду - не грузим его при старте потоков
+        import multiprocessing
+        ctx = multiprocessing.get_context()
+        self.result_queue = ctx.Queue()
+        self.stop_event = ctx.Event()
+        # Общее значение: duty можно менять на ходу без перезапуска процессов
+        self.duty_value = ctx.Value('d', self.duty, lock=False)
+        self.active_value = ctx.Value('i', self.workers, lock=False)
+        self.job_queues = [ctx.Queue() for _ in range(self.workers)]
+        self.processes = []
+        self.running = True
+
+        for i in range(self.workers):
+            process = ctx.Process(
+                target=process_worker,
+                args=(i, self.job_queues[i], self.result_queue,
+                      self.stop_event, self.batch, self.engine, self.duty_value,
+                      self.active_value),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        self.dispatch()
+
+        self.collector = threading.Thread(target=self.collect_worker, name='collector', daemon=True)
+        self.collector.start()
+
+    def set_duty(self, duty):
+        self.duty = duty
+        if self.running:
+            self.duty_value.value = duty
+
+    def set_active(self, count):
+        """Сколько процессов майнят; остальные простаивают, не теряя задание"""
+        if self.running:
+            self.active_value.value = count
+
+    def dispatch(self, index=None):
+        """Новое задание: prefetch диапазонов каждому процессу; index - один на замену исчерпанного"""
+        # Задание пула может прийти раньше, чем созданы очереди - раздаст start()
+        if not self.running:
+            return
+        indices = range(self.workers) if index is None else [index]
+        count = self.prefetch if index is None else 1
+        for i in indices:
+            for _ in range(count):
+                work = self.scheduler.next_work()
+                if work is None:
+                    return
+                self.job_queues[i].put(work)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+    def collect_worker(self):
+        """Сбор отчетов от процессов"""
+        while self.running:
+            try:
+                message = self.result_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            kind, index = message[0], message[1]
+            if kind == 'hashes':
+                self.idle[index] += message[4]
+                if self.on_hashes:
+                    self.on_hashes(index, message[2], message[3])
+            elif kind == 'share':
+                if self.on_share:
+                    self.on_share(index, message[2], message[3], message[4])
+            elif kind == 'exhausted':
+                self.dispatch(index)
+                if self.on_exhausted:
+                    self.on_exhausted(index, message[2])
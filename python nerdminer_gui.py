@@ -7,56 +7,164 @@ from kivy.graphics import Color, Rectangle, Line
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.utils import get_color_from_hex
+import collections
+import math
 import threading
 import time
-import hashlib
-import random
 import requests
 import json
 from datetime import datetime
+from nerdminer_hashing import HeaderHasher, demo_header, DEMO_SHARE_TARGET, MAX_NONCE
+from nerdminer_workers import duty_sleep
+from nerdminer_tuning import load_tuning
+from nerdminer_thermal import ThermalSensors, ThermalGovernor
+
+# Сколько nonce перебирать за один проход воркера
+HASH_BATCH = 256
+# Доля CPU для майнинга рядом с интерфейсом, если автотюнинг не запускался
+GUI_DUTY = 0.5
+# Кадр при 60 FPS; зависание - кадр длиннее одного такого с запасом на дрожание
+FRAME_TIME = 1 / 60
+FRAME_TOLERANCE = 0.005
+# Столбцов min/max в истории (на экране - не больше ширины графика в пикселях)
+# и глубина истории (точек, 1 точка в секунду)
+GRAPH_COLUMNS = 240
+GRAPH_HISTORY = 6 * 3600
 
 # Горизонтальный OLED стиль NerdMiner
 Window.clearcolor = get_color_from_hex('#000000')
 Window.size = (600, 200)  # Горизонтальный дисплей
 
+class MinMaxHistory:
+    """История хешрейта в столбцах min/max: память и отрисовка не зависят от длины"""
+    
+    def __init__(self, columns=GRAPH_COLUMNS, max_samples=GRAPH_HISTORY):
+        self.capacity = columns
+        self.max_samples = max_samples
+        # Сколько точек сворачивается в один столбец
+        self.per_column = 1
+        self.columns = collections.deque()
+        self.current = None
+        
+    def add(self, value):
+        if self.current is None:
+            self.current = [value, value, 0]
+        current = self.current
+        current[0] = min(current[0], value)
+        current[1] = max(current[1], value)
+        current[2] += 1
+        if current[2] < self.per_column:
+            return
+            
+        self.columns.append((current[0], current[1]))
+        self.current = None
+        if len(self.columns) <= self.capacity:
+            return
+            
+        if self.per_column * self.capacity < self.max_samples:
+            # Пока история короче предела - сливаем соседние столбцы попарно
+            last = self.columns.pop()
+            merged = collections.deque()
+            while len(self.columns) > 1:
+                low1, high1 = self.columns.popleft()
+                low2, high2 = self.columns.popleft()
+                merged.append((min(low1, low2), max(high1, high2)))
+            if self.columns:
+                # Нечетный остаток в паре с последним - уже полный новый столбец
+                low, high = self.columns.popleft()
+                merged.append((min(low, last[0]), max(high, last[1])))
+            else:
+                self.current = [last[0], last[1], self.per_column]
+            self.columns = merged
+            self.per_column *= 2
+        else:
+            # Дальше кольцевой буфер: самый старый столбец уходит
+            self.columns.popleft()
+            
+    def view(self, columns=None):
+        """Столбцы (min, max) для отрисовки, включая незаполненный; не больше columns"""
+        view = list(self.columns)
+        if self.current is not None:
+            view.append((self.current[0], self.current[1]))
+        if columns and len(view) > columns:
+            # Узкий виджет: соседние столбцы сливаются до его ширины
+            size = math.ceil(len(view) / columns)
+            view = [(min(low for low, high in view[i:i + size]), max(high for low, high in view[i:i + size]))
+                    for i in range(0, len(view), size)]
+        return view
+
 class HashRateGraph(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.points = []
+        self.history = MinMaxHistory()
         self.size_hint = (1, 0.3)
         
-    def on_size(self, *args):
-        self.update_graph()
-        
-    def add_point(self, hash_rate):
-        if hash_rate > 0:
-            self.points.append(hash_rate)
-            if len(self.points) > 30:
-                self.points.pop(0)
-            self.update_graph()
-        
-    def update_graph(self):
-        self.canvas.clear()
-        if not self.points:
-            return
-            
+        # Инструкции создаются один раз, дальше меняются только их свойства
         with self.canvas:
             # Фон
             Color(0.05, 0.05, 0.05, 1)
-            Rectangle(pos=self.pos, size=self.size)
+            self.background = Rectangle(pos=self.pos, size=self.size)
             
             # Линия графика
             Color(0, 1, 0, 1)
-            max_val = max(self.points) if max(self.points) > 0 else 1
+            self.line = Line(points=[], width=1.5)
+            
+        self.bind(pos=self.update_graph, size=self.update_graph)
+        
+    def add_point(self, hash_rate):
+        if hash_rate > 0:
+            self.history.add(hash_rate)
+            self.update_graph()
+        
+    def update_graph(self, *args):
+        self.background.pos = self.pos
+        self.background.size = self.size
+        
+        # Не больше столбца на пиксель ширины
+        view = self.history.view(max(2, int(self.width)))
+        if len(view) < 2:
+            self.line.points = []
+            return
             
-            points = []
-            for i, value in enumerate(self.points):
-                x = self.x + (i / (len(self.points) - 1)) * self.width if len(self.points) > 1 else self.x
-                y = self.y + (value / max_val) * self.height
-                points.extend([x, y])
+        max_val = max(high for low, high in view) or 1
+        step = self.width / (len(view) - 1)
+        
+        # Огибающая min/max: по две точки на столбец
+        points = []
+        for i, (low, high) in enumerate(view):
+            x = self.x + i * step
+            points.extend([x, self.y + (low / max_val) * self.height,
+                           x, self.y + (high / max_val) * self.height])
+        self.line.points = points
+
+class FrameProbe:
+    """Замер длительности кадров главного цикла на время фоновой операции"""
+    
+    def __init__(self, frame_time=FRAME_TIME, tolerance=FRAME_TOLERANCE):
+        self.frame_time = frame_time
+        self.tolerance = tolerance
+        self.event = None
+        self.max_frame = 0
+        self.stalls = 0
+        
+    def begin(self):
+        self.max_frame = 0
+        self.stalls = 0
+        # Интервал 0 - вызов на каждом кадре, только пока идет замер
+        if self.event is None:
+            self.event = Clock.schedule_interval(self.tick, 0)
+        
+    def tick(self, dt):
+        self.max_frame = max(self.max_frame, dt)
+        if dt > self.frame_time + self.tolerance:
+            self.stalls += 1
             
-            if len(points) >= 4:
-                Line(points=points, width=1.5)
+    def end(self):
+        """Остановка замера, возвращает (максимальный кадр в секундах, число зависаний)"""
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+        return self.max_frame, self.stalls
 
 class NetworkData:
     def __init__(self):
@@ -205,10 +313,17 @@ class NerdMinerGUI(BoxLayout):
         self.accepted_shares = 0
         self.uptime = 0
         self.start_time = 0
-        self.temperature = 42
+        self.temperature = None
+        # Температура из sysfs; регулятор снижает duty майнинга при перегреве
+        self.sensors = ThermalSensors()
+        self.governor = ThermalGovernor(1, GUI_DUTY)
         
-        # Сетевые данные
+        # Сетевые данные (запросы только в фоновом потоке)
         self.network_data = NetworkData()
+        self.network_refreshing = False
+        # Клавиша R во время обновления - еще одно обновление сразу после него
+        self.refresh_pending = False
+        self.frame_probe = FrameProbe()
         
         # Управление кнопками
         self.power_last_press = 0
@@ -282,7 +397,7 @@ class NerdMinerGUI(BoxLayout):
         
         # Температура
         self.temp_label = Label(
-            text='Temp: 42°C',
+            text='Temp: --',
             font_size='12sp',
             color=get_color_from_hex('#888888'),
             size_hint=(1, 0.1)
@@ -384,8 +499,7 @@ class NerdMinerGUI(BoxLayout):
             return True
         # R - принудительное обновление данных
         elif keycode[1] == 'r':
-            self.network_data.last_update = 0  # Сбрасываем таймер
-            self.network_data.update_all()
+            self.force_network_refresh()
             return True
         # Q - выход
         elif keycode[1] == 'q':
@@ -440,6 +554,11 @@ class NerdMinerGUI(BoxLayout):
             self.screen_on = True
             self.update_screen_state()
             
+        # Результат автотюнинга (nerdminer_v2_android.py --tune --cpu-budget 0.5)
+        tuned = load_tuning('threads', 'hashlib', GUI_DUTY) or {}
+        self.mining_batch = tuned.get('batch', HASH_BATCH)
+        self.governor = ThermalGovernor(1, tuned.get('duty', GUI_DUTY))
+        
         self.mining = True
         self.start_time = time.time()
         self.status_label.text = 'MINING'
@@ -460,13 +579,23 @@ class NerdMinerGUI(BoxLayout):
         local_hashes = 0
         last_stat_time = time.time()
         
+        batch = self.mining_batch
+        governor = self.governor
+        
+        # Midstate считается один раз на заголовок, дальше меняется только nonce
+        hasher = HeaderHasher(demo_header())
+        nonce = 0
+        
         while self.mining:
-            # Имитация майнинга SHA-256
-            data = f"nerdminer{time.time()}{random.randint(0, 1000000)}"
-            hash_result = hashlib.sha256(data.encode()).hexdigest()
+            started = time.perf_counter()
+            found = hasher.scan(nonce, batch, DEMO_SHARE_TARGET)
+            nonce += batch
+            if nonce + batch > MAX_NONCE + 1:
+                hasher = HeaderHasher(demo_header())
+                nonce = 0
             
-            self.total_hashes += 1
-            local_hashes += 1
+            self.total_hashes += batch
+            local_hashes += batch
             
             # Обновление хешрейта каждую секунду
             current_time = time.time()
@@ -475,11 +604,10 @@ class NerdMinerGUI(BoxLayout):
                 local_hashes = 0
                 last_stat_time = current_time
                 
-            # Случайное нахождение шара
-            if random.random() < 0.001:
-                self.accepted_shares += 1
+            # Шар - хеш ниже цели
+            self.accepted_shares += len(found)
                 
-            time.sleep(0.003)
+            duty_sleep(time.perf_counter() - started, governor.duty)
             
     def start_background_tasks(self):
         """Запуск фоновых задач"""
@@ -519,8 +647,41 @@ class NerdMinerGUI(BoxLayout):
             self.graph.add_point(self.hash_rate)
             
     def update_network_data(self, dt):
-        """Обновление сетевых данных"""
-        if self.network_data.update_all():
+        """Обновление сетевых данных в фоновом потоке, UI не блокируется"""
+        if self.network_refreshing:
+            return
+        self.network_refreshing = True
+        self.frame_probe.begin()
+        threading.Thread(target=self.network_worker, daemon=True).start()
+        
+    def force_network_refresh(self):
+        """Обновление без учета минутного таймера; идущее обновление не теряет запрос"""
+        if self.network_refreshing:
+            self.refresh_pending = True
+            return
+        self.network_data.last_update = 0  # Сбрасываем таймер
+        self.update_network_data(0)
+        
+    def network_worker(self):
+        """Фоновый поток: блокирующие запросы, результат - в главный поток"""
+        try:
+            updated = self.network_data.update_all()
+        except Exception as e:
+            print(f"Network data error: {e}")
+            updated = False
+        Clock.schedule_once(lambda dt: self.apply_network_data(updated))
+        
+    def apply_network_data(self, updated):
+        """Применение сетевых данных (главный поток)"""
+        self.network_refreshing = False
+        max_frame, stalls = self.frame_probe.end()
+        if stalls:
+            print(f"⚠️ UI stalled during network refresh: {stalls} frames, max {max_frame * 1000:.0f} ms")
+        if self.refresh_pending:
+            self.refresh_pending = False
+            self.force_network_refresh()
+        
+        if updated:
             # Обновляем UI с реальными данными
             self.block_label.text = f'Block: {self.network_data.block_height:,}'
             self.price_label.text = f'BTC: ${self.network_data.btc_price:,.0f}'
@@ -530,13 +691,13 @@ class NerdMinerGUI(BoxLayout):
         
     def update_temperature(self, dt):
         """Обновление температуры"""
+        temperature = self.sensors.temperature()
+        if temperature is None:
+            self.temp_label.text = 'Temp: --'
+            return
+        self.temperature = round(temperature)
         if self.mining:
-            base_temp = 40
-            load_factor = min(self.hash_rate / 50000, 1.0)
-            self.temperature = base_temp + int(load_factor * 20)
-        else:
-            self.temperature = max(35, self.temperature - 1)
-            
+            self.governor.update(temperature)
         self.temp_label.text = f'Temp: {self.temperature}°C'
 
 class NerdMinerApp(App):